@@ -0,0 +1,18 @@
+-- Migration 004: Exact-match lookup indexes
+-- Run this after 003_search_indexes.sql
+-- Backs find_song_id, which resolves songs by preview URL, local file path
+-- or filename without scanning the songs table
+
+CREATE INDEX IF NOT EXISTS idx_songs_filename
+    ON songs (filename);
+
+CREATE INDEX IF NOT EXISTS idx_songs_preview_url
+    ON songs (preview_url);
+
+-- Local files record their path inside the metadata JSONB column
+CREATE INDEX IF NOT EXISTS idx_songs_metadata_path
+    ON songs ((metadata->>'path'));
+
+-- Keyset pagination in list_songs, which pages in (created_at, song_id) order
+CREATE INDEX IF NOT EXISTS idx_songs_created_at_song_id
+    ON songs (created_at, song_id);
@@ -0,0 +1,17 @@
+-- Migration 005: Combined lowercase search column
+-- Run this after 004_lookup_indexes.sql
+-- find_song_id matches a name against artist, title and filename with a
+-- single LIKE on this column instead of one ILIKE per column
+
+ALTER TABLE songs
+ADD COLUMN IF NOT EXISTS search_blob text
+    GENERATED ALWAYS AS (
+        lower(
+            COALESCE(artist, '') || E'\n' ||
+            COALESCE(title, '') || E'\n' ||
+            COALESCE(filename, '')
+        )
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_songs_search_blob_trgm
+    ON songs USING GIN (search_blob gin_trgm_ops);
@@ -1,13 +1,104 @@
+import asyncio
+import aiohttp
+import random
+from concurrent.futures import ThreadPoolExecutor
 import requests
-import re
-from typing import List, Dict, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import List, Dict, Optional, Tuple
+from urllib.parse import parse_qs
+
+try:
+    # google-re2 compiles to a linear-time DFA; the patterns below are RE2-safe
+    import re2 as re
+except ImportError:
+    import re
+
+try:
+    import orjson as json_parser
+except ImportError:
+    # orjson not installed, fall back to the standard library parser
+    import json as json_parser
+
+# Case-insensitivity is set inline because RE2 does not accept re flags
+_SONG_URL = re.compile(
+    r'(?i)^https?://(?:music|itunes)\.apple\.com/([a-z]{2})/song/([^/?]+)/(\d+)/?(?:\?|$)'
+)
+_NUM_TAIL = re.compile(r'/(\d+)(?:\?|$)')
+_COUNTRY_PATTERN = re.compile(r'(?i)://(?:music|itunes)\.apple\.com/([a-z]{2})/')
+_TRACK_NAME = re.compile(r'/song/([^/]+)/\d+')
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def create_session(pool_maxsize: int = 64) -> requests.Session:
+    """
+    Create a keep-alive requests session that retries transient failures.
+    
+    429 and 5xx responses are retried with exponential backoff, honoring
+    the server's Retry-After header, so rate limiting does not surface as a
+    failed lookup or download.
+    
+    Args:
+        pool_maxsize: Maximum pooled connections per host
+        
+    Returns:
+        session (requests.Session): Configured session
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=10,
+        pool_maxsize=pool_maxsize,
+        max_retries=Retry(
+            total=5,
+            backoff_factor=0.5,
+            status_forcelist=RETRY_STATUS_CODES,
+            respect_retry_after_header=True
+        )
+    )
+    session.mount('https://', adapter)
+    return session
+
+def run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+    
+    asyncio.run refuses to start inside a running event loop (Streamlit,
+    Jupyter), so in that case the coroutine gets its own loop on a worker
+    thread and this call blocks until it finishes.
+    
+    Args:
+        coro: Coroutine to run
+        
+    Returns:
+        The coroutine's result
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(asyncio.run, coro).result()
 
 class AppleMusicClient:
     BASE_URL = "https://itunes.apple.com/search"
     LOOKUP_URL = "https://itunes.apple.com/lookup"
+    MAX_CONCURRENT_LOOKUPS = 64
+    MAX_LOOKUP_RETRIES = 5
+    LOOKUP_BATCH_SIZE = 25
+    URL_CACHE_SIZE = 4096
 
     def __init__(self):
-        """Initialize Apple Music client."""
+        """Initialize Apple Music client with a pooled keep-alive session."""
+        self.session = create_session()
+        # Resolved URL -> track data, so repeated URLs skip the network
+        self._url_cache: Dict[str, Dict] = {}
+
+    def _cache_track(self, url: str, track_data: Dict):
+        """Remember a resolved URL, evicting the oldest entry when full."""
+        if len(self._url_cache) >= self.URL_CACHE_SIZE:
+            self._url_cache.pop(next(iter(self._url_cache)))
+        self._url_cache[url] = track_data
 
     def search(self, term, limit=20, entity="song", media="music", country_code=None):
         """
@@ -33,9 +124,9 @@ class AppleMusicClient:
             params["country"] = country_code.lower()
         
         try:
-            response = requests.get(self.BASE_URL, params=params)
+            response = self.session.get(self.BASE_URL, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = json_parser.loads(response.content)
             return data.get("results", [])
         except Exception as e:
             print(f"Error searching Apple Music: {e}")
@@ -51,27 +142,41 @@ class AppleMusicClient:
         Returns:
             track_data (dict): Track dictionary with full iTunes API data, or None if not found
         """
-        track_id = self._extract_track_id(track_url)
+        track_url = track_url.strip()
+        cached = self._url_cache.get(track_url)
+        if cached is not None:
+            return cached
+        
+        track_id, country_code, track_name = self._parse_url(track_url)
         if not track_id:
             print(f"Could not extract track ID from URL: {track_url}")
             return None
         
-        country_code = self._extract_country_code(track_url)
         result = self.lookup_track(track_id, track_url, country_code)
         
         # If direct lookup fails, try searching by track name from URL
         if not result:
-            track_name = self._extract_track_name(track_url)
-            if track_name:
-                print(f"  Attempting search fallback for: {track_name}")
-                search_results = self.search(track_name, limit=5, entity="song", media="music")
-                if search_results:
-                    # Return first result that looks like a match
-                    # (could be improved with better matching logic)
-                    return search_results[0]
+            result = self._search_fallback(track_name)
         
+        if result:
+            self._cache_track(track_url, result)
         return result
 
+    def _search_fallback(self, track_name: Optional[str]) -> Optional[Dict]:
+        """
+        Search for a track using the name embedded in its URL.
+        
+        Used when the Lookup API has no result for the URL's track ID.
+        """
+        if track_name:
+            print(f"  Attempting search fallback for: {track_name}")
+            search_results = self.search(track_name, limit=5, entity="song", media="music")
+            if search_results:
+                # Return first result that looks like a match
+                # (could be improved with better matching logic)
+                return search_results[0]
+        return None
+
     def lookup_track(self, track_id: str, original_url: str = None, country_code: str = None) -> Optional[Dict]:
         """
         Lookup track information using iTunes Lookup API.
@@ -89,39 +194,20 @@ class AppleMusicClient:
             if country_code:
                 params["country"] = country_code.lower()
             
-            response = requests.get(self.LOOKUP_URL, params=params)
+            response = self.session.get(self.LOOKUP_URL, params=params)
             response.raise_for_status()
-            data = response.json()
+            data = json_parser.loads(response.content)
             
             results = data.get("results", [])
-            if not results:
+            if not results and country_code:
                 # Try without country code as fallback if country was specified
-                if country_code:
-                    params_no_country = {"id": track_id}
-                    response = requests.get(self.LOOKUP_URL, params=params_no_country)
-                    response.raise_for_status()
-                    data = response.json()
-                    results = data.get("results", [])
-                
-                if not results:
-                    if original_url:
-                        print(f"  No results from iTunes API for track ID {track_id} (URL: {original_url})")
-                    else:
-                        print(f"  No results from iTunes API for track ID {track_id}")
-                    return None
-            
-            # Check if first result is a track
-            first_result = results[0]
-            if first_result.get("wrapperType") == "track":
-                return first_result
-            
-            # If not a track, log what we got
-            wrapper_type = first_result.get("wrapperType", "unknown")
-            if original_url:
-                print(f"  iTunes API returned {wrapper_type} instead of track for ID {track_id} (URL: {original_url})")
-            else:
-                print(f"  iTunes API returned {wrapper_type} instead of track for ID {track_id}")
-            return None
+                params_no_country = {"id": track_id}
+                response = self.session.get(self.LOOKUP_URL, params=params_no_country)
+                response.raise_for_status()
+                data = json_parser.loads(response.content)
+                results = data.get("results", [])
+
+            return self._select_track(results, track_id, original_url)
         except Exception as e:
             if original_url:
                 print(f"  Error looking up track {track_id} (URL: {original_url}): {e}")
@@ -129,9 +215,147 @@ class AppleMusicClient:
                 print(f"  Error looking up track {track_id}: {e}")
             return None
 
-    def get_tracks_from_urls(self, track_urls: List[str]) -> List[Dict]:
+    def _select_track(self, results: List[Dict], track_id: str, original_url: str = None) -> Optional[Dict]:
         """
-        Get track information from a list of Apple Music/iTunes track URLs.
+        Pick the track entry from Lookup API results.
+        
+        Args:
+            results (list): The "results" array of a Lookup API response
+            track_id (str): iTunes track ID that was looked up
+            original_url (str): Original URL for better error messages
+            
+        Returns:
+            track_data (dict): Track dictionary, or None if results hold no track
+        """
+        if not results:
+            if original_url:
+                print(f"  No results from iTunes API for track ID {track_id} (URL: {original_url})")
+            else:
+                print(f"  No results from iTunes API for track ID {track_id}")
+            return None
+        
+        # Check if first result is a track
+        first_result = results[0]
+        if first_result.get("wrapperType") == "track":
+            return first_result
+        
+        # If not a track, log what we got
+        wrapper_type = first_result.get("wrapperType", "unknown")
+        if original_url:
+            print(f"  iTunes API returned {wrapper_type} instead of track for ID {track_id} (URL: {original_url})")
+        else:
+            print(f"  iTunes API returned {wrapper_type} instead of track for ID {track_id}")
+        return None
+
+    def _index_tracks(self, results: List[Dict]) -> Dict[str, Dict]:
+        """Map Lookup API track results to their track ID, dropping non-tracks."""
+        return {
+            str(result["trackId"]): result
+            for result in results
+            if result.get("wrapperType") == "track" and "trackId" in result
+        }
+
+    def lookup_tracks_batch(self, track_ids: List[str], country_code: str = None) -> Dict[str, Dict]:
+        """
+        Lookup many tracks at once using comma-separated Lookup API IDs.
+        
+        Sends one request per LOOKUP_BATCH_SIZE IDs instead of one per track.
+        
+        Args:
+            track_ids (list): iTunes track IDs
+            country_code (str): ISO country code (e.g., 'us', 'be') for country-specific lookup
+            
+        Returns:
+            tracks (dict): Track dictionaries keyed by track ID (misses are absent)
+        """
+        tracks = {}
+        for start in range(0, len(track_ids), self.LOOKUP_BATCH_SIZE):
+            chunk = track_ids[start:start + self.LOOKUP_BATCH_SIZE]
+            params = {"id": ",".join(chunk)}
+            if country_code:
+                params["country"] = country_code.lower()
+            try:
+                response = self.session.get(self.LOOKUP_URL, params=params)
+                response.raise_for_status()
+                data = json_parser.loads(response.content)
+                tracks.update(self._index_tracks(data.get("results", [])))
+            except Exception as e:
+                print(f"  Error looking up tracks {params['id']}: {e}")
+        return tracks
+
+    async def _fetch_lookup_results_async(self, session: aiohttp.ClientSession, params: Dict) -> List[Dict]:
+        """
+        Issue one Lookup API request, backing off on rate limiting.
+        
+        429 and 5xx responses are retried up to MAX_LOOKUP_RETRIES times,
+        sleeping for the Retry-After header if present and otherwise for
+        a jittered, exponentially growing delay.
+        """
+        backoff = 0.5
+        for attempt in range(self.MAX_LOOKUP_RETRIES + 1):
+            async with session.get(self.LOOKUP_URL, params=params) as response:
+                retryable = response.status in RETRY_STATUS_CODES
+                if retryable and attempt < self.MAX_LOOKUP_RETRIES:
+                    retry_after = response.headers.get("Retry-After", "")
+                    if retry_after.isdigit():
+                        delay = float(retry_after)
+                    else:
+                        # Jitter keeps concurrent lookups from retrying in lockstep
+                        delay = backoff * random.uniform(0.5, 1.5)
+                    await asyncio.sleep(delay)
+                    backoff *= 2
+                    continue
+                response.raise_for_status()
+                data = json_parser.loads(await response.read())
+                return data.get("results", [])
+        return []
+
+    async def _lookup_tracks_batch_async(
+        self,
+        session: aiohttp.ClientSession,
+        semaphore: asyncio.Semaphore,
+        track_ids: List[str],
+        country_code: str = None
+    ) -> Dict[str, Dict]:
+        """
+        Async counterpart of lookup_tracks_batch sharing a single ClientSession.
+        
+        Chunks of LOOKUP_BATCH_SIZE IDs are requested concurrently, bounded
+        by the given semaphore.
+        
+        Returns:
+            tracks (dict): Track dictionaries keyed by track ID (misses are absent)
+        """
+        async def lookup_chunk(chunk):
+            params = {"id": ",".join(chunk)}
+            if country_code:
+                params["country"] = country_code.lower()
+            try:
+                async with semaphore:
+                    results = await self._fetch_lookup_results_async(session, params)
+                return self._index_tracks(results)
+            except Exception as e:
+                print(f"  Error looking up tracks {params['id']}: {e}")
+                return {}
+        
+        chunks = [
+            track_ids[start:start + self.LOOKUP_BATCH_SIZE]
+            for start in range(0, len(track_ids), self.LOOKUP_BATCH_SIZE)
+        ]
+        tracks = {}
+        for found in await asyncio.gather(*(lookup_chunk(chunk) for chunk in chunks)):
+            tracks.update(found)
+        return tracks
+
+    async def get_tracks_from_urls_async(self, track_urls: List[str]) -> List[Dict]:
+        """
+        Get track information for many URLs with batched, concurrent lookups.
+        
+        Track IDs are grouped by country and sent LOOKUP_BATCH_SIZE per
+        request; at most MAX_CONCURRENT_LOOKUPS requests are in flight at
+        once. IDs missing from the country storefront are retried without a
+        country, and only the remaining misses use the per-URL search
+        fallback. Results keep the input URL order.
         
         Args:
             track_urls (list): List of Apple Music or iTunes track URLs
@@ -139,20 +363,106 @@ class AppleMusicClient:
         Returns:
             tracks (list): List of track dictionaries with full iTunes API data
         """
-        tracks = []
+        parsed = []
+        ids_by_country: Dict[Optional[str], Dict[str, None]] = {}
         for url in track_urls:
-            url = url.strip()
+            url = url.strip() if url else ""
             if not url:
                 continue
             
-            track_data = self.get_track_from_url(url)
+            if url in self._url_cache:
+                parsed.append((url, None, None, None))
+                continue
+            
+            track_id, country_code, track_name = self._parse_url(url)
+            if not track_id:
+                print(f"Could not extract track ID from URL: {url}")
+                parsed.append((url, None, None, None))
+                continue
+            
+            parsed.append((url, track_id, country_code, track_name))
+            # dict keeps insertion order while dropping duplicate IDs
+            ids_by_country.setdefault(country_code, {})[track_id] = None
+        
+        semaphore = asyncio.Semaphore(self.MAX_CONCURRENT_LOOKUPS)
+        connector = aiohttp.TCPConnector(limit_per_host=self.MAX_CONCURRENT_LOOKUPS)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            countries = list(ids_by_country)
+            found_by_country = dict(zip(countries, await asyncio.gather(*(
+                self._lookup_tracks_batch_async(
+                    session, semaphore, list(ids_by_country[country]), country
+                )
+                for country in countries
+            ))))
+            
+            # Retry storefront misses without a country code
+            missing = {
+                track_id: None
+                for country, ids in ids_by_country.items() if country
+                for track_id in ids if track_id not in found_by_country[country]
+            }
+            found_anywhere = {}
+            if missing:
+                found_anywhere = await self._lookup_tracks_batch_async(
+                    session, semaphore, list(missing)
+                )
+        
+        tracks = []
+        for url, track_id, country_code, track_name in parsed:
+            track_data = self._url_cache.get(url)
+            if track_id:
+                track_data = (
+                    found_by_country[country_code].get(track_id)
+                    or found_anywhere.get(track_id)
+                )
+                if not track_data:
+                    print(f"  No results from iTunes API for track ID {track_id} (URL: {url})")
+                    track_data = self._search_fallback(track_name)
             if track_data:
+                self._cache_track(url, track_data)
                 tracks.append(track_data)
             else:
                 print(f"Skipping invalid URL: {url}")
         
         return tracks
 
+    def get_tracks_from_urls(self, track_urls: List[str]) -> List[Dict]:
+        """
+        Get track information from a list of Apple Music/iTunes track URLs.
+        
+        Synchronous wrapper around get_tracks_from_urls_async.
+        
+        Args:
+            track_urls (list): List of Apple Music or iTunes track URLs
+            
+        Returns:
+            tracks (list): List of track dictionaries with full iTunes API data
+        """
+        return run_sync(self.get_tracks_from_urls_async(track_urls))
+
+    def _parse_url(self, url: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """
+        Extract track ID, country code and track name from a URL in one pass.
+        
+        Canonical song URLs (https://music.apple.com/be/song/levels/1442882814)
+        are handled by a single precompiled match; anything else falls back
+        to the individual extractors.
+        
+        Returns:
+            (track_id, country_code, track_name), each None if not found
+        """
+        url = url.strip()
+        match = _SONG_URL.match(url)
+        if match:
+            country_code, raw_name, track_id = match.groups()
+            return track_id, country_code.lower(), self._clean_track_name(raw_name)
+        
+        return (
+            self._extract_track_id(url),
+            self._extract_country_code(url),
+            self._extract_track_name(url),
+        )
+
     def _extract_track_id(self, url: str) -> Optional[str]:
         """
         Extract track ID from Apple Music or iTunes URL.
@@ -160,32 +470,35 @@ class AppleMusicClient:
         Supports formats like:
         - https://music.apple.com/be/song/levels-radio-edit/1442882814
         - https://itunes.apple.com/us/song/id1442882814
-        - https://music.apple.com/us/album/.../1442882814?i=...
+        - https://music.apple.com/us/album/.../1440818664?i=1442882814
+        
+        For album URLs the track ID is the ``i`` query parameter.
         """
-        url = url.strip()
+        url, _, query = url.strip().partition('?')
         
-        # Remove query parameters
-        if '?' in url:
-            url = url.split('?')[0]
+        # Album URLs point at the song with ?i=<track id>
+        if query:
+            song_param = parse_qs(query).get('i', [None])[0]
+            if song_param and song_param.isdigit():
+                return song_param
         
         # Try to extract numeric ID from end of URL
-        # Apple Music URLs: .../song/title/ID or .../album/.../ID?i=...
-        parts = url.rstrip('/').split('/')
-        last_part = parts[-1] if parts else ""
+        # Apple Music URLs: .../song/title/ID
+        last_part = url.rstrip('/').rpartition('/')[2]
         
         # Check if last part is a numeric ID
         if last_part.isdigit():
             return last_part
         
-        # Try regex pattern for URLs with /id123456 format
-        pattern = r'/id(\d+)'
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
+        # URLs with /id123456 format
+        _, found, tail = url.rpartition('/id')
+        if found:
+            id_part = tail.partition('/')[0]
+            if id_part.isdigit():
+                return id_part
         
         # Try to find any numeric ID in the URL
-        pattern = r'/(\d+)(?:\?|$)'
-        match = re.search(pattern, url)
+        match = _NUM_TAIL.search(url)
         if match:
             return match.group(1)
         
@@ -205,8 +518,7 @@ class AppleMusicClient:
         url = url.strip()
         
         # Pattern for music.apple.com/{country}/...
-        pattern = r'://(?:music|itunes)\.apple\.com/([a-z]{2})/'
-        match = re.search(pattern, url, re.IGNORECASE)
+        match = _COUNTRY_PATTERN.search(url)
         if match:
             return match.group(1).lower()
         
@@ -226,11 +538,13 @@ class AppleMusicClient:
         url = url.strip()
         
         # Pattern for .../song/{track-name}/{id}
-        pattern = r'/song/([^/]+)/\d+'
-        match = re.search(pattern, url)
+        match = _TRACK_NAME.search(url)
         if match:
-            # Replace hyphens with spaces and clean up
-            track_name = match.group(1).replace('-', ' ').replace('_', ' ')
-            return track_name
+            return self._clean_track_name(match.group(1))
         
         return None
+
+    def _clean_track_name(self, slug: str) -> str:
+        """Turn a URL slug like 'levels-radio-edit' into a search term."""
+        # Replace hyphens with spaces and clean up
+        return slug.replace('-', ' ').replace('_', ' ')
@@ -1,66 +1,165 @@
+import asyncio
 import os
-import requests
+import shutil
+import aiohttp
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
 from tqdm import tqdm
+from src.apple_api.client import create_session, run_sync
 
-def download_preview(url, save_path):
+_session = None
+
+# Characters that are unsafe in filenames on any platform
+_SANITIZE_TABLE = str.maketrans({c: '_' for c in '/\\:*?"<>|'})
+
+def sanitize_filename(name):
+    """
+    Replace characters that are invalid in filenames with underscores.
+    
+    Args:
+        name: Artist or track name to use in a filename
+        
+    Returns:
+        str: The name with unsafe characters replaced in a single pass
+    """
+    return name.translate(_SANITIZE_TABLE)
+
+def _default_session():
+    """Shared retrying session for callers that don't pass their own."""
+    global _session
+    if _session is None:
+        _session = create_session()
+    return _session
+
+def download_preview(url, save_path, session=None):
     """
     Download audio preview from URL.
     
     Args:
         url: The URL of the audio file
         save_path: The local path to save the file
+        session: Optional requests.Session to reuse pooled connections
         
     Returns:
         bool: True if successful, False otherwise
     """
+    http = session or _default_session()
     try:
-        response = requests.get(url, stream=True)
-        response.raise_for_status()
-        
-        with open(save_path, 'wb') as f:
-            for chunk in response.iter_content(chunk_size=8192):
-                if chunk:
+        with http.get(url, stream=True) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
+            with open(save_path, 'wb') as f:
+                shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+        return True
+    except Exception as e:
+        print(f"Error downloading {url}: {e}")
+        Path(save_path).unlink(missing_ok=True)
+        return False
+
+async def _download_preview_async(session, semaphore, url, save_path):
+    """Stream one preview to disk on a shared aiohttp session."""
+    try:
+        async with semaphore, session.get(url) as response:
+            response.raise_for_status()
+            with open(save_path, 'wb') as f:
+                async for chunk in response.content.iter_chunked(1024 * 1024):
                     f.write(chunk)
         return True
     except Exception as e:
         print(f"Error downloading {url}: {e}")
-        if os.path.exists(save_path):
-            os.remove(save_path)
+        Path(save_path).unlink(missing_ok=True)
         return False
 
-def batch_download(tracks, output_dir):
+async def download_previews_async(items, max_concurrent=32):
+    """
+    Download many previews concurrently on a single event loop.
+    
+    Args:
+        items: (url, save_path) pairs
+        max_concurrent: Maximum downloads in flight at once
+        
+    Returns:
+        list: True/False per item, in input order
+    """
+    semaphore = asyncio.Semaphore(max_concurrent)
+    connector = aiohttp.TCPConnector(limit=max_concurrent)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        return await asyncio.gather(*(
+            _download_preview_async(session, semaphore, url, save_path)
+            for url, save_path in items
+        ))
+
+def download_previews(items, max_concurrent=32):
+    """
+    Download many previews concurrently.
+    
+    Synchronous wrapper around download_previews_async.
+    
+    Args:
+        items: (url, save_path) pairs
+        max_concurrent: Maximum downloads in flight at once
+        
+    Returns:
+        list: True/False per item, in input order
+    """
+    if not items:
+        return []
+    return run_sync(download_previews_async(items, max_concurrent))
+
+def batch_download(tracks, output_dir, session=None, max_workers=16):
     """
     Download multiple track previews in batch.
     
     Args:
         tracks: List of track dictionaries from the API
         output_dir: Directory to save files
+        session: Optional requests.Session to reuse pooled connections
+        max_workers: Number of concurrent downloads
         
     Returns:
         list: List of paths to downloaded files
     """
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    # One directory listing instead of a stat() per track
+    existing_files = set(os.listdir(output_dir))
         
-    downloaded_paths = []
-    
-    print(f"Downloading {len(tracks)} tracks to {output_dir}...")
+    # Every path in track order (first occurrence), mapped to whether it is on disk
+    succeeded = {}
+    tasks = {}
     
-    for track in tqdm(tracks, desc="Downloading previews"):
+    for track in tracks:
         preview_url = track.get("previewUrl")
         if not preview_url:
             continue
             
-        artist = track.get("artistName", "Unknown").replace("/", "_")
-        name = track.get("trackName", "Unknown").replace("/", "_")
+        artist = sanitize_filename(track.get("artistName", "Unknown"))
+        name = sanitize_filename(track.get("trackName", "Unknown"))
         filename = f"{artist} - {name}.m4a"
         save_path = os.path.join(output_dir, filename)
         
-        if os.path.exists(save_path):
-            downloaded_paths.append(save_path)
+        if save_path in succeeded:
             continue
-            
-        if download_preview(preview_url, save_path):
-            downloaded_paths.append(save_path)
-            
-    return downloaded_paths
+        
+        if filename in existing_files:
+            succeeded[save_path] = True
+            continue
+        
+        # Keyed by path so duplicate tracks never write the same file twice
+        succeeded[save_path] = False
+        tasks[save_path] = preview_url
+    
+    print(f"Downloading {len(tasks)} tracks to {output_dir}...")
+    session = session or _default_session()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(download_preview, url, path, session): path
+            for path, url in tasks.items()
+        }
+        with tqdm(total=len(futures), desc="Downloading previews") as progress:
+            for future in as_completed(futures):
+                succeeded[futures[future]] = future.result()
+                progress.update(1)
+    
+    # Downloads finish in any order; report paths in the order of tracks
+    return [path for path, ok in succeeded.items() if ok]
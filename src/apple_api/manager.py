@@ -29,6 +29,8 @@ class AppleMusicManager:
             return []
             
         print(f"Found {len(tracks)} tracks. Starting download...")
-        downloaded_files = batch_download(tracks, output_dir)
+        downloaded_files = batch_download(
+            tracks, output_dir, session=self.client.session
+        )
         
         return downloaded_files
@@ -1,24 +1,20 @@
 import click
+import contextlib
+import json
 import os
+import shlex
 import sys
-import numpy as np
+import traceback
 import uuid
-from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from pathlib import Path
 
 # Add project root to path so we can run this script directly
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-# Load .env file if it exists
-try:
-    from dotenv import load_dotenv
-    env_path = Path(__file__).parent.parent / '.env'
-    if env_path.exists():
-        load_dotenv(env_path)
-except ImportError:
-    pass
-
 from src.embeddings.embedder import AudioEmbedder
+from src.embeddings.preprocessing import extract_metadata
 from src.similarity.recommender import Recommender
 from src.visualization.projector import Projector
 from src.visualization.plot import (
@@ -27,6 +23,25 @@ from src.visualization.plot import (
 )
 from src.storage.factory import create_storage_backend
 from src.apple_api.manager import AppleMusicManager
+from src.apple_api.client import AppleMusicClient
+from src.apple_api.downloader import download_preview, sanitize_filename
+
+@lru_cache(maxsize=1)
+def get_storage():
+    """Storage backend shared by every command run in this process."""
+    return create_storage_backend()
+
+DEFAULT_MODEL = 'laion/clap-htsat-unfused'
+
+@lru_cache(maxsize=1)
+def get_embedder(model_name):
+    """Embedder shared across commands, so the CLAP model loads once."""
+    return AudioEmbedder(storage_backend=get_storage(), model_name=model_name)
+
+@lru_cache(maxsize=1)
+def get_recommender():
+    """Recommender shared across commands."""
+    return Recommender(storage_backend=get_storage())
 
 @click.group()
 def cli():
@@ -35,11 +50,10 @@ def cli():
 
 @cli.command()
 @click.option('--input_dir', required=True, help='Directory containing audio files')
-@click.option('--model', default='laion/clap-htsat-unfused', help='CLAP model name')
+@click.option('--model', default=DEFAULT_MODEL, help='CLAP model name')
 def embed(input_dir, model):
     """Embeds all audio files and stores in the database."""
-    storage = create_storage_backend()
-    embedder = AudioEmbedder(storage_backend=storage, model_name=model)
+    embedder = get_embedder(model)
     embedder.embed_library(input_dir)
 
 @cli.command()
@@ -51,8 +65,8 @@ def embed(input_dir, model):
 @click.option('--interactive', is_flag=True, help='Interactively search and select a song')
 def recommend(song_path, song_name, song_id, search, k, interactive):
     """Finds similar songs using vector search in the database."""
-    storage = create_storage_backend()
-    recommender = Recommender(storage_backend=storage)
+    storage = get_storage()
+    recommender = get_recommender()
     
     # If search query provided, use advanced search to find song
     if search:
@@ -141,7 +155,7 @@ def recommend(song_path, song_name, song_id, search, k, interactive):
 @click.option('--show-scores', is_flag=True, help='Show relevance scores')
 def search(query, limit, search_type, show_scores):
     """Search songs using advanced search (FTS, trigram, hybrid)."""
-    storage = create_storage_backend()
+    storage = get_storage()
     
     # Check if search_songs method exists (Postgres backend)
     if not hasattr(storage, 'search_songs'):
@@ -177,7 +191,6 @@ def search(query, limit, search_type, show_scores):
                 
     except Exception as e:
         click.echo(f"Error during search: {e}", err=True)
-        import traceback
         traceback.print_exc()
 
 @cli.command()
@@ -190,36 +203,36 @@ def search(query, limit, search_type, show_scores):
     '--method',
     default='umap',
     type=click.Choice(['umap', 'tsne']),
-    help='Projection method'
+    help='Projection method (tsne is legacy and much slower)'
 )
-def visualize(output_file, method):
+@click.option('--n-neighbors', default=15, help='UMAP neighbourhood size')
+@click.option('--min-dist', default=0.1, help='UMAP minimum distance between points')
+@click.option(
+    '--seed',
+    type=int,
+    default=42,
+    show_default=True,
+    help='Random seed for a reproducible layout (UMAP runs single-threaded when seeded)'
+)
+@click.option('--limit', type=int, default=None, help='Maximum number of songs to plot')
+def visualize(output_file, method, n_neighbors, min_dist, seed, limit):
     """Visualizes the embeddings from the database."""
-    storage = create_storage_backend()
-    recommender = Recommender(storage_backend=storage)
-    
-    # Load all embeddings for visualization
-    # TODO: BROKEN - recommender.metadata is intentionally empty
-    # (see recommender.py:22)
-    # This will always return empty list. Should load songs directly
-    # from storage instead.
-    # See ISSUES.md #1 for details.
-    embeddings_list = []
-    valid_metadata = []
+    storage = get_storage()
     
-    for meta in recommender.metadata:
-        song_id = meta.get('song_id')
-        if song_id:
-            embedding = storage.get_embedding(song_id)
-            if embedding is not None:
-                embeddings_list.append(embedding)
-                valid_metadata.append(meta)
+    # Load all embeddings and their metadata in one query
+    song_ids, embeddings_array, valid_metadata = storage.get_all_embeddings_with_metadata(limit=limit)
     
-    if not embeddings_list:
+    if not song_ids:
         click.echo("No embeddings found in the database.")
         return
     
-    embeddings_array = np.vstack(embeddings_list)
-    projector = Projector(method=method)
+    projector = Projector(
+        method=method,
+        random_state=seed,
+        n_neighbors=n_neighbors,
+        min_dist=min_dist,
+        n_jobs=-1
+    )
     projections = projector.fit_transform(embeddings_array)
     
     if output_file.endswith('.html'):
@@ -255,20 +268,36 @@ def download(query, limit, output_dir, auto_embed):
     click.echo(f"Downloaded {len(files)} files to {output_dir}")
     
     if auto_embed:
-        storage = create_storage_backend()
-        embedder = AudioEmbedder(storage_backend=storage)
+        storage = get_storage()
+        embedder = get_embedder(DEFAULT_MODEL)
         click.echo("Embedding and uploading to the database...")
+        
+        # One lookup up front: skip files already embedded by an earlier run
+        signatures = storage.get_file_signatures()
+        pending = []
         for file_path in files:
+            if file_path in signatures:
+                click.echo(f"Already embedded {Path(file_path).name}, skipping")
+                continue
+            pending.append(file_path)
+        
+        embeddings = embedder.embed_files(pending)
+        for file_path, embedding in zip(pending, embeddings):
             try:
-                # Embed and store
-                embedding = embedder.embed_file(file_path)
+                # Store the batched embedding
                 if embedding is not None:
                     song_id = storage.upload_audio(file_path)
                     storage.store_embedding(song_id, embedding)
-                    from src.embeddings.preprocessing import extract_metadata
                     meta = extract_metadata(file_path)
                     meta['filename'] = Path(file_path).name
                     meta['path'] = file_path
+                    # File signature, so reruns can skip this file
+                    stat = os.stat(file_path)
+                    meta['metadata'] = {
+                        'path': file_path,
+                        'mtime': stat.st_mtime,
+                        'size': stat.st_size
+                    }
                     storage.store_metadata(song_id, meta)
                     filename = Path(file_path).name
                     click.echo(
@@ -305,37 +334,32 @@ def import_playlist(track_urls_file, track_url, temp_dir):
     with one URL per line) or --track-url (can be used multiple times)
     must be provided.
     """
-    from src.apple_api.client import AppleMusicClient
-    from src.apple_api.downloader import download_preview
-    import tempfile
-    import shutil
-    
     # Collect track URLs
     track_urls = []
     
     if track_urls_file:
+        # Read the file once; every branch below works on this text
         try:
-            import json
-            
             with open(track_urls_file, 'r', encoding='utf-8') as f:
-                # Try to parse as JSON first
-                try:
-                    data = json.load(f)
-                    if isinstance(data, list):
-                        track_urls = [str(url).strip() for url in data if url]
-                    elif isinstance(data, str):
-                        track_urls = [str(url).strip() for url in data.split('\n') if url]
-                    else:
-                        click.echo(f"Invalid JSON format: {data}", err=True)
-                        return
-                    click.echo(f"Loaded {len(track_urls)} track URLs from JSON file")
-                except json.JSONDecodeError:
-                    click.echo(f"Error parsing JSON file: {f.read()}", err=True)
-                    return
-        except Exception as e:
+                text = f.read()
+        except OSError as e:
             click.echo(f"Error reading track URLs file: {e}", err=True)
-            click.echo(f"File content: {f.read()}", err=True)
             return
+        
+        # Try to parse as JSON first, then fall back to one URL per line
+        try:
+            data = json.loads(text)
+        except json.JSONDecodeError:
+            data = text
+        
+        if isinstance(data, list):
+            track_urls = [str(url).strip() for url in data if url]
+        elif isinstance(data, str):
+            track_urls = [line.strip() for line in data.splitlines() if line.strip()]
+        else:
+            click.echo(f"Invalid JSON format: {text[:200]}", err=True)
+            return
+        click.echo(f"Loaded {len(track_urls)} track URLs from {track_urls_file}")
     
     if track_url:
         track_urls.extend(track_url)
@@ -349,8 +373,8 @@ def import_playlist(track_urls_file, track_url, temp_dir):
     
     # Initialize clients
     client = AppleMusicClient()
-    storage = create_storage_backend()
-    embedder = AudioEmbedder(storage_backend=storage)
+    storage = get_storage()
+    embedder = get_embedder(DEFAULT_MODEL)
     
     # Get track data from URLs using iTunes Lookup API
     click.echo("Fetching track data from iTunes Lookup API...")
@@ -369,122 +393,187 @@ def import_playlist(track_urls_file, track_url, temp_dir):
     # Create temp directory
     os.makedirs(temp_dir, exist_ok=True)
     
-    # Process each track
+    # Process tracks as a pipeline: downloads run concurrently, embeddings
+    # are generated one at a time, and database writes overlap with both
     successful = 0
     failed = 0
     skipped = 0
     
-    for track_data in tracks:
+    def fetch_track(track_data):
+        """Check for an existing copy, then download the preview."""
+        preview_url = track_data.get("previewUrl")
+        if not preview_url:
+            return "No preview URL available", None
+        
+        # Check if song already in DB (by track_id)
+        track_id = track_data.get("trackId")
+        if track_id in existing_track_ids:
+            return f"Already in database (track_id: {track_id})", None
+        
+        # Download preview temporarily
+        artist = track_data.get("artistName", "Unknown")
+        title = track_data.get("trackName", "Unknown")
+        filename = f"{sanitize_filename(artist)} - {sanitize_filename(title)}.m4a"
+        # Prefixed with the track ID so concurrent downloads never share a path
+        temp_path = os.path.join(temp_dir, f"{track_id}_{filename}")
+        if not download_preview(preview_url, temp_path, session=client.session):
+            return "Failed to download preview", None
+        return None, temp_path
+    
+    def build_metadata(track_data):
+        """Build the metadata record for a track from its iTunes data."""
+        artist = track_data.get("artistName", "Unknown")
+        title = track_data.get("trackName", "Unknown")
+        preview_url = track_data.get("previewUrl")
+        
+        # Store metadata with preview URL; iTunes already supplies everything,
+        # so the downloaded file is not re-parsed
+        duration_ms = track_data.get("trackTimeMillis")
+        meta = {}
+        meta['filename'] = f"{sanitize_filename(artist)} - {sanitize_filename(title)}.m4a"
+        meta['path'] = preview_url  # Store preview URL as path reference
+        meta['artist'] = artist
+        meta['title'] = title
+        meta['preview_url'] = preview_url
+        meta['genre'] = track_data.get("primaryGenreName")
+        meta['trackId'] = track_data.get("trackId")
+        meta['track_id'] = track_data.get("trackId")
+        meta['collectionName'] = track_data.get("collectionName")
+        meta['collectionId'] = track_data.get("collectionId")
+        meta['collection_name'] = track_data.get("collectionName")
+        meta['collection_id'] = track_data.get("collectionId")
+        meta['artistViewUrl'] = track_data.get("artistViewUrl")
+        meta['artist_view_url'] = track_data.get("artistViewUrl")
+        meta['collectionViewUrl'] = track_data.get("collectionViewUrl")
+        meta['collection_view_url'] = track_data.get("collectionViewUrl")
+        meta['trackViewUrl'] = track_data.get("trackViewUrl")
+        meta['track_view_url'] = track_data.get("trackViewUrl")
+        meta['artworkUrl'] = track_data.get("artworkUrl100")
+        meta['artwork_url'] = track_data.get("artworkUrl100")
+        meta['releaseDate'] = track_data.get("releaseDate")
+        meta['release_date'] = track_data.get("releaseDate")
+        meta['trackTimeMillis'] = duration_ms
+        meta['track_time_millis'] = duration_ms
+        if duration_ms:
+            meta['duration'] = duration_ms / 1000.0
+        return meta
+    
+    def store_batch(batch):
+        """Store one embedded batch in a single transaction, then delete its temp files."""
         try:
-            artist = track_data.get("artistName", "Unknown")
-            title = track_data.get("trackName", "Unknown")
-            preview_url = track_data.get("previewUrl")
-            track_id = track_data.get("trackId")
-            
-            click.echo(f"\nProcessing: {artist} - {title}")
+            # Create song records with preview URLs (not local paths)
+            # Generate a new UUID for each song ID
+            song_ids = [str(uuid.uuid4()) for _ in batch]
+            records = [
+                (song_id, build_metadata(track_data))
+                for song_id, (track_data, _, _, _) in zip(song_ids, batch)
+            ]
             
-            if not preview_url:
-                click.echo(f"  No preview URL available")
+            # Songs, genres and embeddings commit together, so a failed
+            # embeddings write never leaves songs behind that later runs skip
+            stored = storage.store_songs_batch(
+                records, [embedding for _, _, _, embedding in batch]
+            )
+            return [
+                (label, song_id if stored else None)
+                for song_id, (_, _, label, _) in zip(song_ids, batch)
+            ]
+        finally:
+            # Always delete temp files
+            for _, temp_path, _, _ in batch:
+                Path(temp_path).unlink(missing_ok=True)
+    
+    # A track listed twice is only imported once; the checks below run
+    # concurrently and would otherwise let both copies through
+    unique_tracks = {}
+    for track_data in tracks:
+        track_id = track_data.get("trackId")
+        if track_id is not None and track_id in unique_tracks:
+            click.echo(
+                f"{track_data.get('artistName', 'Unknown')} - {track_data.get('trackName', 'Unknown')}: "
+                f"Duplicate in playlist (track_id: {track_id})"
+            )
+            skipped += 1
+            continue
+        unique_tracks[track_id if track_id is not None else id(track_data)] = track_data
+    tracks = list(unique_tracks.values())
+    
+    # One bulk lookup instead of an existence query per track
+    existing_track_ids = storage.get_existing_track_ids(
+        [track_data.get("trackId") for track_data in tracks]
+    )
+    
+    with ThreadPoolExecutor(max_workers=16) as download_pool, \
+            ThreadPoolExecutor(max_workers=4) as store_pool:
+        downloads = {
+            download_pool.submit(fetch_track, track_data): track_data
+            for track_data in tracks
+        }
+        stores = {}
+        pending = []  # (track_data, temp_path, label) awaiting embedding
+        
+        def embed_pending():
+            """Embed buffered downloads in one batch and queue their writes."""
+            nonlocal failed
+            # Embedding stays on this thread so the model runs one batch at a time
+            embeddings = embedder.embed_files([temp_path for _, temp_path, _ in pending])
+            batch = []
+            for (track_data, temp_path, label), embedding in zip(pending, embeddings):
+                if embedding is None:
+                    click.echo(f"{label}: Failed to generate embedding")
+                    failed += 1
+                    Path(temp_path).unlink(missing_ok=True)
+                    continue
+                batch.append((track_data, temp_path, label, embedding))
+            if batch:
+                stores[store_pool.submit(store_batch, batch)] = [label for _, _, label, _ in batch]
+            pending.clear()
+        
+        for future in as_completed(downloads):
+            track_data = downloads[future]
+            label = f"{track_data.get('artistName', 'Unknown')} - {track_data.get('trackName', 'Unknown')}"
+            try:
+                reason, temp_path = future.result()
+            except Exception as e:
+                click.echo(f"{label}: Error processing track: {e}", err=True)
                 failed += 1
                 continue
             
-            # Check if song already in DB (by track_id)
-            track_id = track_data.get("trackId")
-            if track_id:
-                # Use proper filtering with indexed track_id
-                existing_songs = storage.list_songs({"track_id": track_id})
-                if existing_songs:
-                    click.echo(f"  Already in database (track_id: {track_id})")
+            if temp_path is None:
+                click.echo(f"{label}: {reason}")
+                if reason.startswith("Already in database"):
                     skipped += 1
-                    continue
-            
-            # Download preview temporarily
-            filename = f"{artist.replace('/', '_')} - {title.replace('/', '_')}.m4a"
-            temp_path = os.path.join(temp_dir, filename)
-            
-            click.echo(f"  Downloading preview temporarily...")
-            if not download_preview(preview_url, temp_path):
-                click.echo(f"  Failed to download preview")
-                failed += 1
+                else:
+                    failed += 1
                 continue
             
+            pending.append((track_data, temp_path, label))
+            if len(pending) >= embedder.EMBED_BATCH_SIZE:
+                embed_pending()
+        
+        if pending:
+            embed_pending()
+        
+        for future in as_completed(stores):
             try:
-                # Generate embedding
-                click.echo(f"  Generating embedding...")
-                embedding = embedder.embed_file(temp_path)
-                
-                if embedding is None:
-                    click.echo(f"  Failed to generate embedding")
-                    failed += 1
-                    continue
-                
-                # Create song record with preview URL (not local path)
-                # Generate a new UUID for song ID
-                song_id = str(uuid.uuid4())
-                
-                # Store embedding first
-                storage.store_embedding(song_id, embedding)
-                
-                # Store metadata with preview URL
-                from src.embeddings.preprocessing import extract_metadata
-                duration_ms = track_data.get("trackTimeMillis")
-                meta = extract_metadata(temp_path)
-                meta['filename'] = filename
-                meta['path'] = preview_url  # Store preview URL as path reference
-                meta['artist'] = artist
-                meta['title'] = title
-                meta['preview_url'] = preview_url
-                meta['genre'] = track_data.get("primaryGenreName")
-                meta['trackId'] = track_data.get("trackId")
-                meta['track_id'] = track_data.get("trackId")
-                meta['collectionName'] = track_data.get("collectionName")
-                meta['collectionId'] = track_data.get("collectionId")
-                meta['collection_name'] = track_data.get("collectionName")
-                meta['collection_id'] = track_data.get("collectionId")
-                meta['artistViewUrl'] = track_data.get("artistViewUrl")
-                meta['artist_view_url'] = track_data.get("artistViewUrl")
-                meta['collectionViewUrl'] = track_data.get("collectionViewUrl")
-                meta['collection_view_url'] = track_data.get("collectionViewUrl")
-                meta['trackViewUrl'] = track_data.get("trackViewUrl")
-                meta['track_view_url'] = track_data.get("trackViewUrl")
-                meta['artworkUrl'] = track_data.get("artworkUrl100")
-                meta['artwork_url'] = track_data.get("artworkUrl100")
-                meta['releaseDate'] = track_data.get("releaseDate")
-                meta['release_date'] = track_data.get("releaseDate")
-                meta['trackTimeMillis'] = duration_ms
-                meta['track_time_millis'] = duration_ms
-                if duration_ms:
-                    meta['duration'] = duration_ms / 1000.0
-                
-                # Store metadata (this also handles genre insertion)
-                storage.store_metadata(song_id, meta)
-                
-                click.echo(f"  ✓ Stored in database (ID: {song_id})")
-                successful += 1
-                
-            finally:
-                # Always delete temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    click.echo(f"  Cleaned up temporary file")
+                results = future.result()
+            except Exception as e:
+                for label in stores[future]:
+                    click.echo(f"{label}: Error storing track: {e}", err=True)
+                failed += len(stores[future])
+                continue
             
-        except Exception as e:
-            click.echo(f"  Error processing track: {e}", err=True)
-            failed += 1
-            # Clean up temp file on error
-            try:
-                if 'temp_path' in locals() and os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except:
-                pass
-            continue
+            for label, song_id in results:
+                if song_id is None:
+                    click.echo(f"{label}: Failed to store in database")
+                    failed += 1
+                else:
+                    click.echo(f"{label}: ✓ Stored in database (ID: {song_id})")
+                    successful += 1
     
-    # Clean up temp directory if empty
-    try:
-        if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-            os.rmdir(temp_dir)
-    except:
-        pass
+    # Clean up temp directory if empty (rmdir refuses non-empty directories)
+    with contextlib.suppress(OSError):
+        Path(temp_dir).rmdir()
     
     click.echo(f"\n✓ Processing complete!")
     click.echo(f"  Successful: {successful}")
@@ -497,61 +586,69 @@ def import_playlist(track_urls_file, track_url, temp_dir):
 def populate_genres():
     """Populate genres table from existing songs."""
     try:
-        from dotenv import load_dotenv
-        env_path = Path(__file__).parent.parent / '.env'
-        if env_path.exists():
-            load_dotenv(env_path)
-        
-        storage = create_storage_backend()
+        storage = get_storage()
         click.echo("Populating genres table from existing songs...")
         
-        # Get all genres from songs (one-time scan)
-        genres_set = set()
-        page = 1
-        max_pages = 500
-        
-        while page <= max_pages:
-            skip = (page - 1) * 20
-            songs = storage.list_songs(limit=20, skip=skip)
-            
-            if not songs:
-                break
-            
-            for song in songs:
-                genre = song.get('genre')
-                if genre:
-                    genres_set.add(genre)
-            
-            if len(songs) < 20:
-                break
-            
-            page += 1
-        
-        # Add all genres to genres table
-        # Genres are automatically added when storing metadata,
-        # but we can add them directly if needed
-        # This only works with Postgres backend
+        # Postgres: dedupe and insert server-side in a single statement
         if hasattr(storage, '_get_connection'):
             conn = storage._get_connection()
             try:
                 with conn.cursor() as cur:
-                    for genre in genres_set:
-                        cur.execute("""
-                            INSERT INTO genres (genre) VALUES (%s)
-                            ON CONFLICT (genre) DO NOTHING
-                        """, (genre,))
+                    cur.execute("""
+                        INSERT INTO genres (genre)
+                        SELECT DISTINCT genre FROM songs
+                        WHERE genre IS NOT NULL AND genre <> ''
+                        ON CONFLICT (genre) DO NOTHING
+                    """)
+                    added = cur.rowcount
+                    cur.execute("SELECT COUNT(*) FROM genres")
+                    total = cur.fetchone()[0]
                 conn.commit()
             finally:
                 storage._put_connection(conn)
-        else:
-            # For other backends, genres are added automatically when storing metadata
-            click.echo("Note: Genres will be added automatically when storing song metadata")
+            if added:
+                storage.invalidate_genres()
+            click.echo(f"✓ Populated genres table with {total} genres ({added} new)")
+            return
+        
+        # Other backends: collect genres from songs in one projection
+        # Genres are added automatically when storing metadata there
+        genres_set = storage.get_song_genres()
         
-        click.echo(f"✓ Populated genres table with {len(genres_set)} genres")
+        click.echo("Note: Genres will be added automatically when storing song metadata")
+        click.echo(f"✓ Found {len(genres_set)} genres")
     except Exception as e:
         click.echo(f"Error populating genres: {e}", err=True)
 
 
+@cli.command()
+def shell():
+    """Run several commands in one process, sharing the model and database pool."""
+    click.echo("Type a command (e.g. recommend --song_name \"...\"), 'help' or 'exit'.")
+    while True:
+        try:
+            line = input("song-recommender> ").strip()
+        except (EOFError, KeyboardInterrupt):
+            click.echo()
+            break
+        
+        if not line:
+            continue
+        if line in ('exit', 'quit'):
+            break
+        if line == 'help':
+            line = '--help'
+        
+        try:
+            cli.main(args=shlex.split(line), prog_name='cli', standalone_mode=False)
+        except click.exceptions.Abort:
+            click.echo("Aborted.")
+        except click.ClickException as e:
+            e.show()
+        except Exception as e:
+            click.echo(f"Error: {e}", err=True)
+
+
 if __name__ == '__main__':
     cli()
 
@@ -3,6 +3,10 @@ import torch
 import numpy as np
 import json
 import uuid
+import queue
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
 from tqdm import tqdm
 from typing import Optional
 from src.embeddings.model_loader import load_model
@@ -14,6 +18,13 @@ from src.embeddings.preprocessing import (
 from src.storage.backend import StorageBackend
 
 class AudioEmbedder:
+    # Files per forward pass in embed_files
+    EMBED_BATCH_SIZE = 16
+    # Threads decoding audio ahead of the model in embed_files
+    LOAD_WORKERS = 4
+    # Embedded batches allowed to wait for the uploader in embed_library
+    UPLOAD_QUEUE_SIZE = 4
+
     def __init__(self, storage_backend: StorageBackend, model_name="laion/clap-htsat-unfused"):
         """
         Initialize AudioEmbedder.
@@ -26,6 +37,80 @@ class AudioEmbedder:
         self.device = self.model.device
         self.storage_backend = storage_backend
 
+    def _load_features(self, file_path):
+        """
+        Decodes one file and extracts its CLAP input features.
+        
+        Runs on the loader threads in embed_files, so the CPU-side
+        mel-spectrogram work overlaps with the model's forward pass.
+        
+        Returns:
+            dict: Processor outputs for a batch of one, or None if the file
+                could not be loaded
+        """
+        audio, _ = load_audio(file_path)
+        if audio is None:
+            return None
+        return preprocess_audio([audio], self.processor)
+
+    def _embed_inputs(self, inputs):
+        """
+        Runs one forward pass over extracted processor features.
+        
+        Args:
+            inputs: Processor outputs, batched along the first dimension
+            
+        Returns:
+            numpy.ndarray: Normalized embeddings, one row per input
+        """
+        count = len(next(iter(inputs.values())))
+        pin = self.device.type == "cuda"
+        if pin and 1 < count < self.EMBED_BATCH_SIZE:
+            # Pad partial batches by repeating the last clip, so the encoder
+            # only ever sees two shapes (1 and EMBED_BATCH_SIZE) and replays
+            # captured graphs; the padded rows are sliced off below
+            extra = self.EMBED_BATCH_SIZE - count
+            inputs = {
+                k: torch.cat([v, v[-1:].expand(extra, *v.shape[1:])])
+                for k, v in inputs.items()
+            }
+        
+        # Floating-point features must match the model's dtype (float16 on GPU)
+        # Pinned host memory lets the copy to the GPU run asynchronously
+        inputs = {
+            k: (v.pin_memory() if pin else v).to(
+                self.device,
+                dtype=self.model.dtype if v.is_floating_point() else v.dtype,
+                non_blocking=pin
+            )
+            for k, v in inputs.items()
+        }
+        
+        # Half-precision autocast only pays off on CUDA tensor cores
+        autocast = torch.autocast(
+            device_type=self.device.type,
+            dtype=torch.float16,
+            enabled=self.device.type == "cuda"
+        )
+        with torch.inference_mode(), autocast:
+            outputs = self.model.get_audio_features(**inputs)
+        
+        # Normalize on the device, then copy the whole batch to the host once
+        outputs = torch.nn.functional.normalize(outputs.float(), dim=-1)
+        return np.ascontiguousarray(outputs[:count].cpu().numpy())
+
+    def _embed_audios(self, audios):
+        """
+        Runs one forward pass over a batch of waveforms.
+        
+        Args:
+            audios: List of audio waveforms
+            
+        Returns:
+            numpy.ndarray: Normalized embeddings, one row per waveform
+        """
+        return self._embed_inputs(preprocess_audio(audios, self.processor))
+
     def embed_file(self, file_path):
         """
         Generates an embedding for a single audio file.
@@ -41,63 +126,172 @@ class AudioEmbedder:
             return None
         
         try:
-            inputs = preprocess_audio(audio, self.processor)
-            inputs = {k: v.to(self.device) for k, v in inputs.items()}
-            
-            with torch.no_grad():
-                outputs = self.model.get_audio_features(**inputs)
-            
-            embedding = outputs[0].cpu().numpy()
-            norm = np.linalg.norm(embedding)
-            if norm > 0:
-                embedding = embedding / norm
-                
-            return embedding
+            return self._embed_audios([audio])[0]
         except Exception as e:
             print(f"Error embedding file {file_path}: {e}")
             return None
 
+    def embed_files(self, file_paths, batch_size=None):
+        """
+        Generates embeddings for several audio files, one forward pass
+        per minibatch.
+        
+        Args:
+            file_paths: Paths to audio files
+            batch_size: Files per forward pass (default EMBED_BATCH_SIZE)
+            
+        Returns:
+            list: Normalized embedding for each path, in input order
+                (None for files that could not be loaded or embedded)
+        """
+        batch_size = batch_size or self.EMBED_BATCH_SIZE
+        embeddings = [None] * len(file_paths)
+        
+        with ThreadPoolExecutor(max_workers=self.LOAD_WORKERS) as executor:
+            def load_batch(start):
+                return [
+                    executor.submit(self._load_features, file_path)
+                    for file_path in file_paths[start:start + batch_size]
+                ]
+            
+            pending = load_batch(0)
+            for start in range(0, len(file_paths), batch_size):
+                futures = pending
+                # Decode and extract features for the next batch while this
+                # one runs through the model
+                pending = load_batch(start + batch_size)
+                
+                features = []
+                indices = []
+                for i, future in enumerate(futures, start):
+                    try:
+                        inputs = future.result()
+                    except Exception as e:
+                        print(f"Error preprocessing file {file_paths[i]}: {e}")
+                        continue
+                    if inputs is not None:
+                        features.append(inputs)
+                        indices.append(i)
+                
+                if not features:
+                    continue
+                
+                try:
+                    # Clips share one fixed length, so per-file features stack
+                    batch = self._embed_inputs({
+                        k: torch.cat([f[k] for f in features])
+                        for k in features[0].keys()
+                    })
+                    for i, embedding in zip(indices, batch):
+                        embeddings[i] = embedding
+                except Exception as e:
+                    print(f"Error embedding batch of {len(features)} files: {e}")
+        
+        return embeddings
+
     def embed_library(self, input_dir):
         """
         Embeds all audio files in a directory and stores in the database.
         
+        Files whose modification time and size match what was recorded
+        when they were last embedded are skipped.
+        
         Args:
             input_dir: Directory containing audio files
         """
         audio_extensions = ('.mp3', '.wav', '.flac', '.m4a')
-        files = [
-            f for f in os.listdir(input_dir)
-            if f.lower().endswith(audio_extensions)
-        ]
+        signatures = self.storage_backend.get_file_signatures()
+        
+        unchanged = 0
+        
+        def changed_files():
+            """Yields (entry, stat, known) for new or modified audio files, as the scan runs."""
+            nonlocal unchanged
+            with os.scandir(input_dir) as entries:
+                for entry in entries:
+                    if not entry.is_file() or not entry.name.lower().endswith(audio_extensions):
+                        continue
+                    stat = entry.stat()
+                    known = signatures.get(entry.path)
+                    if known and known['mtime'] == stat.st_mtime and known['size'] == stat.st_size:
+                        unchanged += 1
+                        continue
+                    yield entry, stat, known
         
         metadata_list = []
         
-        print(f"Found {len(files)} audio files in {input_dir}")
+        # Database writes run on a background thread so the model never waits
+        # on storage latency; the bounded queue caps batches held in memory
+        uploads = queue.Queue(maxsize=self.UPLOAD_QUEUE_SIZE)
         
-        for file in tqdm(files, desc="Embedding songs"):
-            file_path = os.path.join(input_dir, file)
-            
-            # Generate embedding
-            embedding = self.embed_file(file_path)
-            if embedding is not None:
-                # Upload to storage backend
-                song_id = self.storage_backend.upload_audio(file_path)
-                
-                # Store embedding
-                self.storage_backend.store_embedding(
-                    song_id,
-                    embedding,
-                    model_name="laion/clap-htsat-unfused"
-                )
-                
-                # Store metadata
-                meta = extract_metadata(file_path)
-                meta['filename'] = file
-                meta['path'] = file_path
-                self.storage_backend.store_metadata(song_id, meta)
-                
-                metadata_list.append({**meta, 'song_id': song_id})
+        def upload_worker():
+            while True:
+                item = uploads.get()
+                if item is None:
+                    break
+                records, stored_embeddings = item
+                try:
+                    # Songs and embeddings are written in one transaction
+                    if not self.storage_backend.store_songs_batch(
+                        records,
+                        stored_embeddings,
+                        model_name="laion/clap-htsat-unfused"
+                    ):
+                        continue
+                    metadata_list.extend({**meta, 'song_id': song_id} for song_id, meta in records)
+                except Exception as e:
+                    print(f"Error storing batch of {len(records)} songs: {e}")
+        
+        uploader = threading.Thread(target=upload_worker, daemon=True)
+        uploader.start()
+        
+        try:
+            # Batches are taken straight off the directory scan, so embedding
+            # starts before the whole directory has been listed
+            files = changed_files()
+            with tqdm(desc="Embedding songs", unit="file") as progress:
+                while True:
+                    batch = list(islice(files, self.EMBED_BATCH_SIZE))
+                    if not batch:
+                        break
+                    embeddings = self.embed_files([entry.path for entry, _, _ in batch])
+                    
+                    records = []
+                    stored_embeddings = []
+                    for (entry, stat, known), embedding in zip(batch, embeddings):
+                        progress.update(1)
+                        if embedding is None:
+                            continue
+                        
+                        # Re-embedded files keep their ID
+                        song_id = known['song_id'] if known else str(uuid.uuid4())
+                        
+                        # Artist and title come from "Artist - Title.ext" filenames
+                        parts = os.path.splitext(entry.name)[0].split(' - ', 1)
+                        
+                        # Record the file signature for next time
+                        meta = extract_metadata(entry.path)
+                        meta['filename'] = entry.name
+                        meta['path'] = entry.path
+                        meta['artist'] = parts[0]
+                        meta['title'] = parts[1] if len(parts) > 1 else entry.name
+                        meta['metadata'] = {
+                            'path': entry.path,
+                            'mtime': stat.st_mtime,
+                            'size': stat.st_size
+                        }
+                        
+                        records.append((song_id, meta))
+                        stored_embeddings.append(embedding)
+                    
+                    if records:
+                        uploads.put((records, stored_embeddings))
+        finally:
+            # Let the uploader drain what is queued, then stop
+            uploads.put(None)
+            uploader.join()
         
+        print(f"Skipped {unchanged} unchanged audio files in {input_dir}")
         print(
             f"Finished embedding. {len(metadata_list)} songs "
             "processed and stored in the database."
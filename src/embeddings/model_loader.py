@@ -1,31 +1,64 @@
 import torch
+from functools import lru_cache
 from transformers import ClapModel, ClapProcessor
 
+@lru_cache(maxsize=2)
 def load_model(model_name="laion/clap-htsat-unfused"):
     """
     Loads the CLAP model and processor from HuggingFace.
-    
+
+    Cached per model name, so every embedder in a process shares one copy
+    of the weights.
+
     Args:
         model_name (str): The name of the model to load.
-        
+
     Returns:
         model (ClapModel): The loaded CLAP model.
         processor (ClapProcessor): The loaded processor.
     """
     print(f"Loading CLAP model: {model_name}...")
     try:
-        model = ClapModel.from_pretrained(model_name)
-        processor = ClapProcessor.from_pretrained(model_name)
-        
+        # Half precision on accelerators; embeddings are L2-normalized
+        # downstream, so the precision loss does not affect similarity.
+        # CPUs without native half/bfloat16 math stay in FP32.
         if torch.cuda.is_available():
-            model = model.to("cuda")
-            print("Model moved to CUDA.")
+            torch.backends.cuda.matmul.allow_tf32 = True
+            torch.backends.cudnn.allow_tf32 = True
+            device, dtype = "cuda", torch.float16
         elif torch.backends.mps.is_available():
-             model = model.to("mps")
-             print("Model moved to MPS.")
+            device, dtype = "mps", torch.float16
         else:
+            device, dtype = "cpu", torch.float32
+
+        # Load straight into the target dtype, without a full FP32 staging copy
+        model = ClapModel.from_pretrained(
+            model_name,
+            torch_dtype=dtype,
+            low_cpu_mem_usage=True
+        )
+        processor = ClapProcessor.from_pretrained(model_name)
+
+        if device == "cpu":
             print("Using CPU.")
-            
+        else:
+            model = model.to(device)
+            print(f"Model moved to {device.upper()} ({dtype}).")
+
+        model = model.eval()
+
+        # Fuse the audio tower into a compiled graph on CUDA. "reduce-overhead"
+        # records CUDA graphs, so after warmup each forward pass is a single
+        # graph replay. Clips are padded to a fixed length and the embedder
+        # pads partial batches, so only a couple of shapes are ever captured.
+        if device == "cuda" and hasattr(torch, "compile"):
+            model.get_audio_features = torch.compile(
+                model.get_audio_features,
+                mode="reduce-overhead",
+                fullgraph=False
+            )
+            print("Compiled audio encoder with torch.compile.")
+
         return model, processor
     except Exception as e:
         print(f"Error loading model: {e}")
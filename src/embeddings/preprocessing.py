@@ -1,14 +1,55 @@
 import librosa
+import soundfile as sf
 import torch
+import torchaudio
 import numpy as np
+import shutil
+import subprocess
 import warnings
+from functools import lru_cache
 warnings.filterwarnings("ignore", category=UserWarning, message=".*PySoundFile.*")
 warnings.filterwarnings("ignore", category=FutureWarning, message=".*audioread.*")
 
+# CLAP's audio tower consumes 10 s at 48 kHz
+CLIP_SAMPLES = 480000
+
+def _read_soundfile(file_path, duration=None):
+    """
+    Decodes an audio file with libsndfile, mixed down to mono.
+    
+    Raises for formats libsndfile cannot read (e.g. AAC in .m4a).
+    """
+    with sf.SoundFile(file_path) as f:
+        frames = -1 if duration is None else int(duration * f.samplerate)
+        audio = f.read(frames, dtype='float32', always_2d=True)
+        return audio.mean(axis=1), f.samplerate
+
+@lru_cache(maxsize=8)
+def _get_resampler(orig_sr, target_sr):
+    """Builds the resampling filter once per rate pair."""
+    return torchaudio.transforms.Resample(
+        orig_sr, target_sr, resampling_method="sinc_interp_kaiser"
+    )
+
+def _read_torchaudio(file_path, duration=None):
+    """
+    Decodes an audio file with torchaudio (ffmpeg backend), mixed down to mono.
+    
+    Covers formats libsndfile cannot read, such as AAC previews in .m4a.
+    """
+    wav, sr = torchaudio.load(file_path)
+    if duration is not None:
+        wav = wav[:, :int(duration * sr)]
+    return wav.mean(dim=0), sr
+
 def load_audio(file_path, target_sr=48000, duration=None):
     """
     Loads an audio file and resamples it to the target sampling rate.
     
+    Tries libsndfile first (in-process, no decoder subprocess), then
+    torchaudio's decoder, and resamples with a cached torchaudio filter.
+    librosa is the last resort for files neither can decode.
+    
     Args:
         file_path (str): Path to the audio file.
         target_sr (int): Target sampling rate (default 48000 for CLAP).
@@ -18,6 +59,16 @@ def load_audio(file_path, target_sr=48000, duration=None):
         audio (np.ndarray): The loaded audio waveform.
         sr (int): The sampling rate.
     """
+    for reader in (_read_soundfile, _read_torchaudio):
+        try:
+            audio, sr = reader(file_path, duration)
+        except Exception:
+            continue
+        audio = torch.as_tensor(audio)
+        if sr != target_sr:
+            audio = _get_resampler(sr, target_sr)(audio)
+        return audio.numpy(), target_sr
+    
     try:
         # mono=True mixes to mono, which is standard for many embeddings
         return librosa.load(file_path, sr=target_sr, mono=True, duration=duration)
@@ -25,10 +76,21 @@ def load_audio(file_path, target_sr=48000, duration=None):
         print(f"Error loading audio file {file_path}: {e}")
         return None, None
 
+def _fix_length(audio, length=CLIP_SAMPLES):
+    """Truncates or zero-pads a waveform to exactly `length` samples."""
+    audio = np.asarray(audio, dtype=np.float32)[:length]
+    if len(audio) < length:
+        audio = np.pad(audio, (0, length - len(audio)))
+    return audio
+
 def preprocess_audio(audio, processor):
     """
+    Every waveform is truncated or zero-padded to CLIP_SAMPLES first, so
+    each batch reaches the model with the same static shape.
+    
     Args:
-        audio (np.ndarray): The audio waveform.
+        audio (np.ndarray or list): The audio waveform, or a list of
+            waveforms to process as one batch.
         processor (ClapProcessor): The CLAP processor.
         
     Returns:
@@ -36,17 +98,55 @@ def preprocess_audio(audio, processor):
     """
     # CLAP processor expects a list of audio arrays or a single array
     # sampling_rate should match what the processor expects (usually 48000)
+    if isinstance(audio, (list, tuple)):
+        audio = [_fix_length(a) for a in audio]
+    else:
+        audio = _fix_length(audio)
     inputs = processor(audio=audio, sampling_rate=48000, return_tensors="pt")
     return inputs
 
+def _ffprobe_duration(file_path):
+    """Reads the container duration with ffprobe, or None if unavailable."""
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return None
+    try:
+        result = subprocess.run(
+            [ffprobe, "-v", "error", "-show_entries", "format=duration",
+             "-of", "default=nw=1:nk=1", file_path],
+            capture_output=True, text=True, timeout=10, check=True
+        )
+        return float(result.stdout.strip())
+    except (subprocess.SubprocessError, ValueError, OSError):
+        return None
+
 def extract_metadata(file_path):
-    """   
+    """
+    Reads the duration from the file header (libsndfile, then ffprobe for
+    containers such as .m4a) without decoding the audio; librosa is only
+    used if neither can read it.
+    
     Args:
         file_path (str): Path to the audio file.
         
     Returns:
         metadata (dict): Dictionary containing metadata (duration, sr, etc).
     """
+    try:
+        info = sf.info(file_path)
+        return {
+            "duration": info.duration,
+            "path": file_path,
+            "sample_rate": info.samplerate,
+            "frames": info.frames,
+        }
+    except Exception:
+        pass
+    
+    duration = _ffprobe_duration(file_path)
+    if duration is not None:
+        return {"duration": duration, "path": file_path}
+    
     try:
         return {
             "duration": librosa.get_duration(path=file_path), 
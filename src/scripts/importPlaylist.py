@@ -2,23 +2,20 @@
 
 import os
 import sys
+import contextlib
+import json
+import queue
+import threading
 import uuid
-from datetime import datetime, timezone
 from pathlib import Path
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from dotenv import load_dotenv
-env_path = Path(__file__).parent.parent.parent / '.env'
-if env_path.exists():
-    load_dotenv(env_path)
-
 from src.apple_api.client import AppleMusicClient
-from src.apple_api.downloader import download_preview
+from src.apple_api.downloader import download_previews, sanitize_filename
 from src.storage.factory import create_storage_backend
 from src.embeddings.embedder import AudioEmbedder
-from src.embeddings.preprocessing import extract_metadata
 from tqdm import tqdm
 
 
@@ -33,29 +30,29 @@ def process_tracks(track_urls_file: str, temp_dir: str = "data/temp"):
     """
     print(f"Processing track URLs from: {track_urls_file}")
     
-    # Load track URLs from file (JSON or text)
+    # Load track URLs from file (JSON or text), reading it only once
     try:
-        import json
-        
         with open(track_urls_file, 'r', encoding='utf-8') as f:
-            # Try to parse as JSON first
-            try:
-                data = json.load(f)
-                if isinstance(data, list):
-                    track_urls = [str(url).strip() for url in data if url]
-                elif isinstance(data, str):
-                    track_urls = [str(url).strip() for url in data.split('\n') if url]
-                else:
-                    print(f"Invalid JSON format: {data}")
-                    return
-                print(f"Loaded {len(track_urls)} track URLs from JSON file")
-            except json.JSONDecodeError:
-                print(f"Error parsing JSON file: {f.read()}")
-                return
-    except Exception as e:
+            text = f.read()
+    except OSError as e:
         print(f"Error reading track URLs file: {e}")
         return
     
+    # Try to parse as JSON first, then fall back to one URL per line
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = text
+    
+    if isinstance(data, list):
+        track_urls = [str(url).strip() for url in data if url]
+    elif isinstance(data, str):
+        track_urls = [line.strip() for line in data.splitlines() if line.strip()]
+    else:
+        print(f"Invalid JSON format: {text[:200]}")
+        return
+    print(f"Loaded {len(track_urls)} track URLs from {track_urls_file}")
+    
     # Initialize clients
     client = AppleMusicClient()
     storage = create_storage_backend()
@@ -79,189 +76,175 @@ def process_tracks(track_urls_file: str, temp_dir: str = "data/temp"):
     failed = 0
     skipped = 0
     
-    # Batch collections for insert_many
-    batch_size = 20
-    songs_batch = []
-    embeddings_batch = []
-    metadata_batch = []
+    # Songs per store_songs_batch call
+    batch_size = 50
+    # Songs whose batch failed to store; only the writer thread updates it
+    write_failures = 0
+    
+    def write_batch(records, embeddings):
+        """Write one batch of songs and their embeddings in a single transaction."""
+        nonlocal write_failures
+        # Songs and embeddings commit together, so a failed write never leaves
+        # songs without embeddings that later runs skip as already imported
+        if storage.store_songs_batch(records, embeddings):
+            tqdm.write(f"  ✓ Inserted {len(records)} songs with embeddings in batch")
+        else:
+            tqdm.write(f"  Error inserting batch of {len(records)} songs")
+            write_failures += len(records)
+    
+    # Rows stream to a writer thread that batches them, so embedding never
+    # waits on the database; the bounded queue applies backpressure if
+    # writes fall behind
+    rows = queue.Queue(maxsize=2 * batch_size)
+    
+    def writer():
+        """Collect queued rows into batches and write each one."""
+        records, embeddings = [], []
+        while True:
+            item = rows.get()
+            if item is not None:
+                records.append(item[0])
+                embeddings.append(item[1])
+            if records and (item is None or len(records) >= batch_size):
+                write_batch(records, embeddings)
+                records, embeddings = [], []
+            if item is None:
+                break
+    
+    writer_thread = threading.Thread(target=writer, daemon=True)
+    writer_thread.start()
+    
+    # One bulk lookup instead of an existence query per track
+    existing_track_ids = storage.get_existing_track_ids(
+        [track_data.get("trackId") for track_data in tracks if track_data.get("trackId")]
+    )
+    
+    # Select the tracks that need importing
+    to_download = []
+    queued_track_ids = set()
+    for track_data in tracks:
+        artist = track_data.get("artistName", "Unknown")
+        title = track_data.get("trackName", "Unknown")
+        
+        if not track_data.get("previewUrl"):
+            tqdm.write(f"{artist} - {title}: No preview URL available")
+            failed += 1
+            continue
+        
+        # Check if song already in DB (by track_id)
+        track_id = track_data.get("trackId")
+        if track_id in existing_track_ids:
+            tqdm.write(f"{artist} - {title}: Already in database (track_id: {track_id})")
+            skipped += 1
+            continue
+        
+        # A track listed twice in the file is only imported once
+        if track_id is not None and track_id in queued_track_ids:
+            tqdm.write(f"{artist} - {title}: Duplicate in input (track_id: {track_id})")
+            skipped += 1
+            continue
+        queued_track_ids.add(track_id)
+        
+        # Prefixed with the track ID so concurrent downloads never share a path
+        filename = f"{sanitize_filename(artist)} - {sanitize_filename(title)}.m4a"
+        temp_path = os.path.join(temp_dir, f"{track_id}_{filename}")
+        to_download.append((track_data, filename, temp_path))
     
-    def flush_batch():
-        """Flush current batch to database."""
-        nonlocal songs_batch, embeddings_batch, metadata_batch
-        if songs_batch:
-            try:
-                storage.songs_table.insert_many(songs_batch, ordered=False)
-                tqdm.write(f"  ✓ Inserted {len(songs_batch)} songs in batch")
-            except Exception as e:
-                tqdm.write(f"  Error inserting songs batch: {e}")
-        if embeddings_batch:
-            try:
-                storage.embeddings_table.insert_many(embeddings_batch, ordered=False)
-                tqdm.write(f"  ✓ Inserted {len(embeddings_batch)} embeddings in batch")
-            except Exception as e:
-                tqdm.write(f"  Error inserting embeddings batch: {e}")
-        if metadata_batch:
-            try:
-                storage.metadata_table.insert_many(metadata_batch, ordered=False)
-                tqdm.write(f"  ✓ Inserted {len(metadata_batch)} metadata in batch")
-            except Exception as e:
-                tqdm.write(f"  Error inserting metadata batch: {e}")
-        songs_batch = []
-        embeddings_batch = []
-        metadata_batch = []
+    # Download all previews concurrently on one event loop before the embedding pass
+    print(f"Downloading {len(to_download)} previews...")
+    downloaded = download_previews(
+        [(track_data["previewUrl"], temp_path) for track_data, _, temp_path in to_download],
+        max_concurrent=32
+    )
     
-    for track_data in tqdm(tracks, desc="Processing tracks", position=0, leave=True):
-        try:
+    # Report failed downloads up front; the rest are embedded in batches
+    ready = []
+    for (track_data, filename, temp_path), ok in zip(to_download, downloaded):
+        if ok:
+            ready.append((track_data, filename, temp_path))
+        else:
             artist = track_data.get("artistName", "Unknown")
             title = track_data.get("trackName", "Unknown")
-            preview_url = track_data.get("previewUrl")
-            track_id = track_data.get("trackId")
-            
-            tqdm.write(f"\nProcessing: {artist} - {title}")
-            
-            if not preview_url:
-                tqdm.write(f"  No preview URL available")
-                failed += 1
-                continue
-            
-            # Check if song already in DB (by track_id)
-            track_id = track_data.get("trackId")
-            if track_id:
-                # Use proper filtering with indexed track_id
-                existing_songs = storage.list_songs({"track_id": track_id})
-                if existing_songs:
-                    tqdm.write(f"  Already in database (track_id: {track_id})")
-                    skipped += 1
-                    continue
-            
-            # Download preview temporarily
-            filename = f"{artist.replace('/', '_')} - {title.replace('/', '_')}.m4a"
-            temp_path = os.path.join(temp_dir, filename)
+            tqdm.write(f"{artist} - {title}: Failed to download preview")
+            failed += 1
+    
+    with tqdm(total=len(ready), desc="Processing tracks", position=0, leave=True) as progress:
+        for start in range(0, len(ready), embedder.EMBED_BATCH_SIZE):
+            batch = ready[start:start + embedder.EMBED_BATCH_SIZE]
             
-            tqdm.write(f"  Downloading preview temporarily...")
-            if not download_preview(preview_url, temp_path):
-                tqdm.write(f"  Failed to download preview")
-                failed += 1
-                continue
+            # One forward pass per batch instead of one per track
+            embeddings = embedder.embed_files([temp_path for _, _, temp_path in batch])
             
-            try:
-                # Generate embedding
-                tqdm.write(f"  Generating embedding...")
-                embedding = embedder.embed_file(temp_path)
+            for (track_data, filename, temp_path), embedding in zip(batch, embeddings):
+                progress.update(1)
+                artist = track_data.get("artistName", "Unknown")
+                title = track_data.get("trackName", "Unknown")
+                preview_url = track_data.get("previewUrl")
                 
-                if embedding is None:
-                    tqdm.write(f"  Failed to generate embedding")
+                try:
+                    tqdm.write(f"\nProcessing: {artist} - {title}")
+                    
+                    if embedding is None:
+                        tqdm.write(f"  Failed to generate embedding")
+                        failed += 1
+                        continue
+                    
+                    # Create song record with preview URL (not local path)
+                    # Generate a new UUID for song ID
+                    song_id = str(uuid.uuid4())
+                    
+                    # Store song metadata with preview URL
+                    duration_ms = track_data.get("trackTimeMillis")
+                    song_data = {
+                        "filename": filename,  # Keep for reference, but file is not stored
+                        "artist": artist,
+                        "title": title,
+                        "duration": duration_ms / 1000.0 if duration_ms else None,
+                        "genre": track_data.get("primaryGenreName"),
+                        "preview_url": preview_url,  # Store preview URL, not local path
+                        "track_id": track_data.get("trackId"),
+                        "collection_id": track_data.get("collectionId"),
+                        "collection_name": track_data.get("collectionName"),
+                        "artist_view_url": track_data.get("artistViewUrl"),
+                        "collection_view_url": track_data.get("collectionViewUrl"),
+                        "track_view_url": track_data.get("trackViewUrl"),
+                        "artwork_url": track_data.get("artworkUrl100"),
+                        "release_date": track_data.get("releaseDate"),
+                        "track_time_millis": duration_ms,
+                        # There is no metadata table; file details live in the songs.metadata
+                        # JSONB column. Everything comes from the iTunes data already in
+                        # memory, so the downloaded file is not probed a second time.
+                        "metadata": {
+                            "path": preview_url or '',  # Store preview URL as path reference
+                            "embedding_path": '',
+                            "sample_rate": None,
+                            "file_size": None,
+                            "file_hash": ''
+                        }
+                    }
+                    
+                    # Hand the song and its embedding to the writer thread
+                    rows.put(((song_id, song_data), embedding))
+                    
+                    tqdm.write(f"  ✓ Queued for batch insert (ID: {song_id})")
+                    successful += 1
+                    
+                except Exception as e:
+                    tqdm.write(f"  Error processing track: {e}")
                     failed += 1
-                    continue
-                
-                # Create song record with preview URL (not local path)
-                # Generate a new UUID for song ID
-                song_id_uuid = uuid.uuid4()
-                song_id = str(song_id_uuid)  # String version for logging/display
-                
-                # Store song metadata with preview URL
-                duration_ms = track_data.get("trackTimeMillis")
-                song_data = {
-                    "song_id": song_id_uuid,
-                    "filename": filename,  # Keep for reference, but file is not stored
-                    "artist": artist,
-                    "title": title,
-                    "duration": duration_ms / 1000.0 if duration_ms else None,
-                    "genre": track_data.get("primaryGenreName"),
-                    "preview_url": preview_url,  # Store preview URL, not local path
-                    "track_id": track_data.get("trackId"),
-                    "collection_id": track_data.get("collectionId"),
-                    "collection_name": track_data.get("collectionName"),
-                    "artist_view_url": track_data.get("artistViewUrl"),
-                    "collection_view_url": track_data.get("collectionViewUrl"),
-                    "track_view_url": track_data.get("trackViewUrl"),
-                    "artwork_url": track_data.get("artworkUrl100"),
-                    "release_date": track_data.get("releaseDate"),
-                    "created_at": datetime.now(timezone.utc),
-                    "updated_at": datetime.now(timezone.utc),
-                    "metadata": {}
-                }
-                
-                # Prepare embedding data
-                embedding_id = uuid.uuid4()
-                embedding_list = embedding.tolist()
-                embedding_data = {
-                    "embedding_id": embedding_id,
-                    "song_id": song_id_uuid,
-                    "embedding": embedding_list,
-                    "model_name": "laion/clap-htsat-unfused",
-                    "created_at": datetime.now(timezone.utc)
-                }
-                
-                # Store additional metadata
-                meta = extract_metadata(temp_path)
-                meta['filename'] = filename
-                meta['path'] = preview_url  # Store preview URL as path reference
-                meta['artist'] = artist
-                meta['title'] = title
-                meta['preview_url'] = preview_url
-                meta['genre'] = track_data.get("primaryGenreName")
-                meta['track_id'] = track_data.get("trackId")
-                meta['collectionName'] = track_data.get("collectionName")
-                meta['collectionId'] = track_data.get("collectionId")
-                meta['artistViewUrl'] = track_data.get("artistViewUrl")
-                meta['collectionViewUrl'] = track_data.get("collectionViewUrl")
-                meta['trackViewUrl'] = track_data.get("trackViewUrl")
-                meta['artworkUrl'] = track_data.get("artworkUrl100")
-                meta['releaseDate'] = track_data.get("releaseDate")
-                if duration_ms:
-                    meta['duration'] = duration_ms / 1000.0
-                
-                metadata_data = {
-                    "song_id": song_id_uuid,
-                    "filename": meta.get('filename', ''),
-                    "path": meta.get('path', ''),
-                    "embedding_path": meta.get('embedding_path', ''),
-                    "duration": meta.get('duration'),
-                    "sample_rate": meta.get('sample_rate'),
-                    "file_size": meta.get('file_size'),
-                    "file_hash": meta.get('file_hash', ''),
-                    "artist": meta.get('artist', '')
-                }
-                
-                # Add to batches
-                songs_batch.append(song_data)
-                embeddings_batch.append(embedding_data)
-                metadata_batch.append(metadata_data)
-                
-                # Flush batch when it reaches batch_size
-                if len(songs_batch) >= batch_size:
-                    flush_batch()
-                
-                tqdm.write(f"  ✓ Queued for batch insert (ID: {song_id})")
-                successful += 1
-                
-            finally:
-                # Always delete temp file
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-                    tqdm.write(f"  Cleaned up temporary file")
-            
-        except Exception as e:
-            tqdm.write(f"  Error processing track: {e}")
-            failed += 1
-            # Clean up temp file on error
-            try:
-                if 'temp_path' in locals() and os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except:
-                pass
-            continue
+                finally:
+                    # Always delete temp file (download_preview removes partial files itself)
+                    Path(temp_path).unlink(missing_ok=True)
     
-    # Flush any remaining items in batch
-    flush_batch()
+    # Let the writer flush the last partial batch, then stop
+    rows.put(None)
+    writer_thread.join()
+    successful -= write_failures
+    failed += write_failures
     
-    # Clean up temp directory if empty
-    try:
-        if os.path.exists(temp_dir) and not os.listdir(temp_dir):
-            os.rmdir(temp_dir)
-    except:
-        pass
+    # Clean up temp directory if empty (rmdir refuses non-empty directories)
+    with contextlib.suppress(OSError):
+        Path(temp_dir).rmdir()
     
     print(f"\n✓ Processing complete!")
     print(f"  Successful: {successful}")
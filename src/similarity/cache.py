@@ -0,0 +1,78 @@
+import threading
+import time
+import numpy as np
+from collections import OrderedDict
+from typing import List, Dict, Optional
+
+class SimilarityCache:
+    """
+    LRU cache of vector search results keyed by the exact query.
+    
+    The key is the query vector's float32 bytes together with k and the
+    similarity threshold, so a hit always holds scores computed for this
+    very search. Entries are dropped whenever the storage version passed to
+    get() changes, i.e. after any write. The cache is shared by every thread
+    using one Recommender (e.g. Streamlit sessions), so access is locked.
+    """
+    
+    def __init__(self, max_entries=1024, ttl=300.0):
+        """
+        Args:
+            max_entries: Maximum number of cached queries
+            ttl: Seconds before a cached result expires
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._version = None
+        self._entries = OrderedDict()  # (query bytes, k, threshold) -> (timestamp, results)
+        self._lock = threading.Lock()
+    
+    @staticmethod
+    def _key(query_embedding: np.ndarray, k: int, threshold: Optional[float]) -> tuple:
+        return (np.asarray(query_embedding, dtype=np.float32).tobytes(), k, threshold)
+    
+    def get(
+        self,
+        query_embedding: np.ndarray,
+        k: int,
+        threshold: Optional[float] = None,
+        version: Optional[int] = None
+    ) -> Optional[List[Dict]]:
+        """
+        Return cached results for a query, or None on a miss.
+        
+        Args:
+            query_embedding: Query vector
+            k: Number of results wanted
+            threshold: Similarity threshold the results must have been fetched with
+            version: Current storage data version; a change clears the cache
+        """
+        key = self._key(query_embedding, k, threshold)
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._version = version
+            
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            
+            timestamp, results = entry
+            if time.monotonic() - timestamp > self.ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+    
+    def put(self, query_embedding: np.ndarray, k: int, threshold: Optional[float], results: List[Dict]):
+        """Cache the results of a search, evicting the least recently used entry."""
+        key = self._key(query_embedding, k, threshold)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,124 @@
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:
+    # numba not installed, scores are computed with NumPy's BLAS matmul
+    njit = None
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _dot_scores_kernel(matrix, query):
+        scores = np.empty(matrix.shape[0], dtype=np.float32)
+        for i in prange(matrix.shape[0]):
+            s = 0.0
+            for j in range(matrix.shape[1]):
+                s += matrix[i, j] * query[j]
+            scores[i] = s
+        return scores
+
+if njit is not None:
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _l2_normalize_kernel(matrix):
+        for i in prange(matrix.shape[0]):
+            s = 0.0
+            for j in range(matrix.shape[1]):
+                s += matrix[i, j] * matrix[i, j]
+            inv = 1.0 / np.sqrt(s) if s > 0 else 0.0
+            for j in range(matrix.shape[1]):
+                matrix[i, j] *= inv
+
+def l2_normalize_rows(matrix):
+    """
+    Scale each row of matrix to unit length, in place.
+    
+    Zero rows are left as zeros. With numba the norm and the division are
+    fused into one pass per row.
+    
+    Args:
+        matrix (np.ndarray): Contiguous float array of shape (n, d).
+        
+    Returns:
+        np.ndarray: The same array, normalized.
+    """
+    if njit is not None:
+        _l2_normalize_kernel(matrix)
+        return matrix
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix /= np.where(norms > 0, norms, 1)
+    return matrix
+
+def dot_scores(matrix, query):
+    """
+    Dot product of every row of matrix with query.
+    
+    For unit-length rows and query this is the cosine similarity. Uses a
+    parallel numba kernel when numba is installed.
+    
+    Args:
+        matrix (np.ndarray): float32 array of shape (n, d).
+        query (np.ndarray): float32 array of shape (d,).
+        
+    Returns:
+        np.ndarray: float32 scores of shape (n,).
+    """
+    if njit is not None:
+        return _dot_scores_kernel(np.ascontiguousarray(matrix), query)
+    return matrix @ query
+
+def sign_bits(matrix):
+    """
+    Binary-quantize vectors to one sign bit per dimension.
+    
+    Args:
+        matrix (np.ndarray): Array of shape (n, d) or (d,).
+        
+    Returns:
+        np.ndarray: uint8 array of packed bits, shape (n, d / 8) or (d / 8,).
+    """
+    return np.packbits(matrix > 0, axis=-1)
+
+def hamming_candidates(bits, query_bits, m):
+    """
+    Indices of the m rows whose sign bits are closest to the query's.
+    
+    Args:
+        bits (np.ndarray): Packed sign bits of shape (n, d / 8).
+        query_bits (np.ndarray): Packed sign bits of the query.
+        m (int): Number of candidates to keep.
+        
+    Returns:
+        np.ndarray: Unordered candidate row indices.
+    """
+    if len(bits) <= m:
+        return np.arange(len(bits))
+    
+    xor = np.bitwise_xor(bits, query_bits)
+    if hasattr(np, 'bitwise_count'):
+        # NumPy >= 2.0 popcount
+        distances = np.bitwise_count(xor).sum(axis=1, dtype=np.int32)
+    else:
+        distances = np.unpackbits(xor, axis=1).sum(axis=1, dtype=np.int32)
+    return np.argpartition(distances, m - 1)[:m]
+
+def top_k_indices(scores, k):
+    """
+    Indices of the k highest scores, best first.
+    
+    Uses a linear-time partition and only sorts the k winners, instead
+    of sorting every score.
+    
+    Args:
+        scores (np.ndarray): 1-D array of similarity scores.
+        k (int): Number of indices to return.
+        
+    Returns:
+        np.ndarray: Indices into scores, ordered by descending score.
+    """
+    if k <= 0:
+        return np.empty(0, dtype=np.intp)
+    if len(scores) <= k:
+        return np.argsort(-scores)
+    
+    idx = np.argpartition(-scores, k - 1)[:k]
+    return idx[np.argsort(-scores[idx])]
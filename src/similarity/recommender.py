@@ -1,13 +1,22 @@
+from collections import OrderedDict
 from typing import Optional
 from src.storage.backend import StorageBackend
+from src.similarity.cache import SimilarityCache
 
 class Recommender:
+    # Query songs whose ID and embedding are kept in memory between calls
+    LOOKUP_CACHE_SIZE = 256
+
     def __init__(self, storage_backend: StorageBackend):
         """        
         Args:
             storage_backend: Storage backend (required)
         """
         self.storage_backend = storage_backend
+        self.similarity_cache = SimilarityCache()
+        self._song_id_cache = OrderedDict()    # (song_name, song_path) -> song_id
+        self._embedding_cache = OrderedDict()  # song_id -> query embedding
+        self._lookup_version = None            # storage data_version the caches match
         self.metadata = []
         self.load_metadata_from_backend()
 
@@ -34,6 +43,8 @@ class Recommender:
         Returns:
             List of recommendation dictionaries
         """
+        self._check_lookup_caches()
+        
         # Find song_id if not provided
         if song_id is None:
             song_id = self._find_song_id(song_name, song_path)
@@ -43,13 +54,19 @@ class Recommender:
             return []
         
         # Get query embedding
-        query_embedding = self.storage_backend.get_embedding(song_id)
+        query_embedding = self._get_query_embedding(song_id)
         if query_embedding is None:
             print(f"No embedding found for song_id: {song_id}")
             return []
         
-        # Search for similar embeddings using vector search
-        similar_items = self.storage_backend.search_similar(query_embedding, k=k+1)
+        # Search for similar embeddings, reusing results for repeat queries
+        similar_items = self.similarity_cache.get(
+            query_embedding, k=k+1, version=self.storage_backend.data_version
+        )
+        if similar_items is None:
+            similar_items = self.storage_backend.search_similar(query_embedding, k=k+1)
+            if similar_items:
+                self.similarity_cache.put(query_embedding, k+1, None, similar_items)
         
         # Filter out the query song itself and format results
         recommendations = []
@@ -62,14 +79,51 @@ class Recommender:
         
         return recommendations[:k]
     
+    def _check_lookup_caches(self):
+        """Drop remembered IDs and embeddings once the backend has been written to."""
+        version = self.storage_backend.data_version
+        if version != self._lookup_version:
+            self._song_id_cache.clear()
+            self._embedding_cache.clear()
+            self._lookup_version = version
+    
+    def _cache_put(self, cache, key, value):
+        """Insert into an LRU dict, evicting the oldest entry when full."""
+        cache[key] = value
+        cache.move_to_end(key)
+        if len(cache) > self.LOOKUP_CACHE_SIZE:
+            cache.popitem(last=False)
+    
+    def _get_query_embedding(self, song_id):
+        """Get a song's embedding, fetching it from the backend only once."""
+        embedding = self._embedding_cache.get(song_id)
+        if embedding is not None:
+            self._embedding_cache.move_to_end(song_id)
+            return embedding
+        
+        embedding = self.storage_backend.get_embedding(song_id)
+        if embedding is not None:
+            self._cache_put(self._embedding_cache, song_id, embedding)
+        return embedding
+    
     def _find_song_id(self, song_name=None, song_path=None) -> Optional[str]:
         """
         Find song_id by searching the database.
         
         Uses storage backend's efficient search method that searches
-        through all songs with minimal data transfer.
+        through all songs with minimal data transfer. Matches are
+        remembered, so repeat lookups skip the database.
         """
-        return self.storage_backend.find_song_id(
+        key = (song_name, song_path)
+        song_id = self._song_id_cache.get(key)
+        if song_id is not None:
+            self._song_id_cache.move_to_end(key)
+            return song_id
+        
+        song_id = self.storage_backend.find_song_id(
             song_name=song_name,
             song_path=song_path
         )
+        if song_id is not None:
+            self._cache_put(self._song_id_cache, key, song_id)
+        return song_id
@@ -1,7 +1,7 @@
 """Abstract base class for storage backends."""
 
 from abc import ABC, abstractmethod
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 import numpy as np
 
 
@@ -13,6 +13,21 @@ class StorageBackend(ABC):
     embeddings, and metadata.
     """
     
+    # Bumped by every write; see data_version
+    _data_version = 0
+    
+    @property
+    def data_version(self) -> int:
+        """
+        Counter that changes whenever this backend writes songs or embeddings.
+        
+        Caches of query results compare it to detect stale entries.
+        """
+        return self._data_version
+    
+    def _bump_data_version(self):
+        self._data_version += 1
+    
     @abstractmethod
     def upload_audio(self, local_path: str, song_id: Optional[str] = None) -> str:
         """
@@ -41,6 +56,24 @@ class StorageBackend(ABC):
         """
         pass
     
+    def download_audio_many(self, items: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Download several audio files.
+        
+        Backends should override this to fetch concurrently; the default
+        downloads them one at a time.
+        
+        Args:
+            items: (song_id, local_path) pairs
+            
+        Returns:
+            list: True/False per item, in input order
+        """
+        return [
+            self.download_audio(song_id, local_path)
+            for song_id, local_path in items
+        ]
+    
     @abstractmethod
     def get_audio_url(self, song_id: str, expires_in: int = 3600) -> Optional[str]:
         """
@@ -101,6 +134,56 @@ class StorageBackend(ABC):
         """
         pass
     
+    def get_embeddings(self, song_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """
+        Get embedding vectors for several songs as one matrix.
+        
+        Backends should override this with a single round trip; the
+        default fetches them one at a time.
+        
+        Args:
+            song_ids: Song IDs
+            
+        Returns:
+            (found_ids, embeddings): IDs that have an embedding, in input
+            order, and a float32 array with one row per found ID
+        """
+        found_ids = []
+        embeddings = None
+        for song_id in song_ids:
+            embedding = self.get_embedding(song_id)
+            if embedding is None:
+                continue
+            if embeddings is None:
+                embeddings = np.empty((len(song_ids), len(embedding)), dtype=np.float32)
+            embeddings[len(found_ids)] = embedding
+            found_ids.append(song_id)
+        if embeddings is None:
+            return [], np.empty((0, 0), dtype=np.float32)
+        return found_ids, embeddings[:len(found_ids)]
+    
+    def get_all_embeddings_with_metadata(
+        self,
+        limit: Optional[int] = None
+    ) -> Tuple[List[str], np.ndarray, List[Dict]]:
+        """
+        Get every stored embedding together with its song metadata.
+        
+        Backends should override this with a single query; the default
+        lists songs and fetches their embeddings in bulk.
+        
+        Args:
+            limit: Maximum number of songs (default: all)
+            
+        Returns:
+            (song_ids, embeddings, metadata): aligned song IDs, a float32
+            (N, D) array and one metadata dict per row
+        """
+        songs = self.list_songs(limit=limit)
+        metadata_by_id = {str(song['song_id']): song for song in songs if song.get('song_id')}
+        song_ids, embeddings = self.get_embeddings(list(metadata_by_id))
+        return song_ids, embeddings, [metadata_by_id[song_id] for song_id in song_ids]
+    
     @abstractmethod
     def search_similar(
         self,
@@ -153,15 +236,20 @@ class StorageBackend(ABC):
         self,
         filters: Optional[Dict] = None,
         limit: Optional[int] = None,
-        skip: Optional[int] = None
+        skip: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
     ) -> List[Dict]:
         """
-        List songs with optional filters and pagination.
+        List songs with optional filters and pagination, in the order they were added.
         
         Args:
             filters: Optional filters (e.g., {'artist': 'Taylor Swift'})
             limit: Maximum number of songs to return
             skip: Number of songs to skip (for pagination)
+            after: Only return songs listed after this song_id
+                (keyset pagination: pass the last song_id of the previous page)
+            fields: Columns to return (default: all); song_id is always included
             
         Returns:
             List of song dictionaries
@@ -188,4 +276,135 @@ class StorageBackend(ABC):
             song_id if found, None otherwise
         """
         pass
-
+    
+    def get_existing_track_ids(self, track_ids: List[int]) -> set:
+        """
+        Return which of the given iTunes track IDs are already stored.
+        
+        Backends should override this with a single bulk query; the
+        default checks each ID with list_songs.
+        
+        Args:
+            track_ids: iTunes track IDs to check
+            
+        Returns:
+            Set of the track IDs that already have a song
+        """
+        return {
+            track_id for track_id in set(track_ids)
+            if track_id and self.list_songs({'track_id': track_id}, limit=1)
+        }
+    
+    def get_song_genres(self) -> set:
+        """
+        Get the distinct genres of all stored songs.
+        
+        Backends should override this with a single projection query;
+        the default pages through list_songs.
+        
+        Returns:
+            Set of genre names
+        """
+        genres = set()
+        page_size = 1000
+        after = None
+        while True:
+            songs = self.list_songs(limit=page_size, after=after, fields=('genre',))
+            genres.update(song['genre'] for song in songs if song.get('genre'))
+            if len(songs) < page_size:
+                return genres
+            after = songs[-1]['song_id']
+    
+    def invalidate_genres(self):
+        """
+        Drop any cached genre list.
+        
+        Call after writing to the genres table outside this backend's own
+        write methods. Backends that do not cache genres need not override it.
+        """
+        pass
+    
+    def get_file_signatures(self) -> Dict[str, Dict]:
+        """
+        Get the file signature recorded for each embedded local file.
+        
+        Used to skip unchanged files when re-embedding a library.
+        
+        Returns:
+            Dictionary mapping file path to {'song_id', 'mtime', 'size'}
+            (empty if the backend does not record file signatures)
+        """
+        return {}
+    
+    def store_embeddings_batch(
+        self,
+        song_ids: List[str],
+        embeddings: List[np.ndarray],
+        model_name: str = "laion/clap-htsat-unfused"
+    ) -> bool:
+        """
+        Store several embedding vectors.
+        
+        Backends should override this with a single round trip; the
+        default stores them one at a time.
+        
+        Args:
+            song_ids: Song IDs
+            embeddings: Embedding vectors, aligned with song_ids
+            model_name: Name of the model used
+            
+        Returns:
+            success: True if every embedding was stored
+        """
+        results = [
+            self.store_embedding(song_id, embedding, model_name)
+            for song_id, embedding in zip(song_ids, embeddings)
+        ]
+        return all(results)
+    
+    def store_metadata_batch(self, records: List[Tuple[str, Dict]]) -> bool:
+        """
+        Store metadata for several songs.
+        
+        Backends should override this with a single round trip; the
+        default stores them one at a time.
+        
+        Args:
+            records: (song_id, metadata) pairs
+            
+        Returns:
+            success: True if every record was stored
+        """
+        results = [
+            self.store_metadata(song_id, metadata)
+            for song_id, metadata in records
+        ]
+        return all(results)
+    
+    def store_songs_batch(
+        self,
+        records: List[Tuple[str, Dict]],
+        embeddings: List[np.ndarray],
+        model_name: str = "laion/clap-htsat-unfused"
+    ) -> bool:
+        """
+        Store metadata and embeddings for several songs together.
+        
+        Backends should override this to write both in one transaction;
+        the default stores the metadata first, then the embeddings.
+        
+        Args:
+            records: (song_id, metadata) pairs
+            embeddings: Embedding vector for each record, in the same order
+            model_name: Name of the model used to generate the embeddings
+            
+        Returns:
+            success: True if everything was stored
+        """
+        if not self.store_metadata_batch(records):
+            return False
+        return self.store_embeddings_batch(
+            [song_id for song_id, _ in records],
+            embeddings,
+            model_name=model_name
+        )
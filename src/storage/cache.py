@@ -1,4 +1,7 @@
 
+import threading
+import time
+from collections import OrderedDict
 from pathlib import Path
 from typing import Optional, Any
 
@@ -6,14 +9,21 @@ from typing import Optional, Any
 class StorageCache:
     """
     Local cache for frequently accessed data.
-    
-    Caches embeddings and metadata to reduce database queries.
+
+    Caches embeddings and metadata to reduce database queries. Lookups that
+    found nothing can also be remembered for a short time, so repeated
+    misses skip the database.
     """
-    
+
+    # Seconds a not-found result is remembered
+    NEGATIVE_TTL = 60
+    # Not-found results remembered at once
+    NEGATIVE_MAXSIZE = 4096
+
     def __init__(self, cache_dir: Optional[str] = None):
         """
         Initialize cache.
-        
+
         Args:
             cache_dir: Cache directory path (default: ~/.song-recommender/cache)
         """
@@ -21,30 +31,77 @@ class StorageCache:
             cache_dir = Path.home() / '.song-recommender' / 'cache'
         else:
             cache_dir = Path(cache_dir)
-        
+
         self.cache_dir = cache_dir
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
-        
+
         self.embeddings_cache = {}
         self.metadata_cache = {}
-    
+        # (kind, song_id) -> monotonic expiry time of a not-found result
+        self._missing = OrderedDict()
+        self._missing_lock = threading.Lock()
+
     def get_embedding(self, song_id: str) -> Optional[Any]:
         return self.embeddings_cache.get(song_id)
-    
+
     def set_embedding(self, song_id: str, embedding: Any):
         self.embeddings_cache[song_id] = embedding
-    
+        self.clear_missing(song_id)
+
     def get_metadata(self, song_id: str) -> Optional[Any]:
         return self.metadata_cache.get(song_id)
-    
+
     def set_metadata(self, song_id: str, metadata: Any):
         self.metadata_cache[song_id] = metadata
-    
+        self.clear_missing(song_id)
+
+    def _mark_missing(self, kind: str, song_id: str):
+        with self._missing_lock:
+            key = (kind, str(song_id))
+            self._missing[key] = time.monotonic() + self.NEGATIVE_TTL
+            self._missing.move_to_end(key)
+            if len(self._missing) > self.NEGATIVE_MAXSIZE:
+                self._missing.popitem(last=False)
+
+    def _is_missing(self, kind: str, song_id: str) -> bool:
+        with self._missing_lock:
+            key = (kind, str(song_id))
+            expires = self._missing.get(key)
+            if expires is None:
+                return False
+            if time.monotonic() >= expires:
+                del self._missing[key]
+                return False
+            return True
+
+    def mark_missing_metadata(self, song_id: str):
+        """Remember that no metadata exists for song_id."""
+        self._mark_missing('metadata', song_id)
+
+    def is_missing_metadata(self, song_id: str) -> bool:
+        """Whether song_id recently had no metadata."""
+        return self._is_missing('metadata', song_id)
+
+    def mark_missing_embedding(self, song_id: str):
+        """Remember that no embedding exists for song_id."""
+        self._mark_missing('embedding', song_id)
+
+    def is_missing_embedding(self, song_id: str) -> bool:
+        """Whether song_id recently had no embedding."""
+        return self._is_missing('embedding', song_id)
+
+    def clear_missing(self, song_id: str):
+        """Forget not-found results for song_id, e.g. after it is stored."""
+        with self._missing_lock:
+            self._missing.pop(('metadata', str(song_id)), None)
+            self._missing.pop(('embedding', str(song_id)), None)
+
     def invalidate(self, song_id: str):
         self.embeddings_cache.pop(song_id, None)
         self.metadata_cache.pop(song_id, None)
-    
+        self.clear_missing(song_id)
+
     def clear(self):
         self.embeddings_cache.clear()
         self.metadata_cache.clear()
-
+        with self._missing_lock:
+            self._missing.clear()
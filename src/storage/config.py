@@ -1,11 +1,13 @@
 """Storage configuration management."""
 
 import os
+from functools import lru_cache
 from typing import Optional
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from pathlib import Path
 
-# Load .env file if it exists
+# Load .env file if it exists. This is the single place .env is read;
+# entry points pick it up by importing the storage package.
 try:
     from dotenv import load_dotenv
     # Load .env from project root
@@ -17,9 +19,14 @@ except ImportError:
     pass
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class StorageConfig:
-    """Configuration for storage backends."""
+    """
+    Configuration for storage backends.
+    
+    Immutable and hashable, so one instance can be shared and used as a
+    cache key by anything built from it.
+    """
     
     backend_type: str = "postgres"
     # Local storage config
@@ -33,12 +40,17 @@ class StorageConfig:
     postgres_user: Optional[str] = None
     postgres_password: Optional[str] = None
     postgres_sslmode: str = "require"  # Default to require SSL for Neon
+    postgres_pool_size: int = 10  # Maximum pooled connections per process
     
     @classmethod
+    @lru_cache(maxsize=1)
     def from_env(cls) -> 'StorageConfig':
         """
         Create config from environment variables.
         
+        The environment is read once per process; later calls return the
+        same instance.
+        
         Returns:
             StorageConfig instance
         """
@@ -53,19 +65,9 @@ class StorageConfig:
             postgres_user=os.getenv('POSTGRES_USER'),
             postgres_password=os.getenv('POSTGRES_PASSWORD'),
             postgres_sslmode=os.getenv('POSTGRES_SSLMODE', 'require'),
+            postgres_pool_size=int(os.getenv('POSTGRES_POOL_SIZE', '10')),
         )
     
     def to_dict(self) -> dict:
         """Convert config to dictionary."""
-        return {
-            'backend_type': self.backend_type,
-            'local_audio_dir': self.local_audio_dir,
-            'local_embeddings_dir': self.local_embeddings_dir,
-            'postgres_host': self.postgres_host,
-            'postgres_port': self.postgres_port,
-            'postgres_database': self.postgres_database,
-            'postgres_user': self.postgres_user,
-            'postgres_password': self.postgres_password,
-            'postgres_sslmode': self.postgres_sslmode,
-        }
-
+        return asdict(self)
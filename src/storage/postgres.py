@@ -1,21 +1,173 @@
 """Postgres/Neon storage backend using psycopg2."""
 
+import heapq
+import threading
+import time
 import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
-from typing import List, Dict, Optional
+from functools import cached_property, lru_cache
+from typing import List, Dict, Optional, Sequence, Set, Tuple
 from datetime import datetime, timezone
 from pathlib import Path
 import psycopg2
-from psycopg2.extras import execute_values, RealDictCursor, register_uuid
+from psycopg2.extensions import AsIs, register_adapter
+from psycopg2.extras import (
+    execute_values,
+    Json,
+    RealDictCursor,
+    register_default_json,
+    register_default_jsonb,
+    register_uuid
+)
 from psycopg2.pool import ThreadedConnectionPool
 import json
 
 from src.storage.backend import StorageBackend
+from src.storage.cache import StorageCache
 from src.storage.config import StorageConfig
+from src.similarity.cosine import (
+    dot_scores,
+    hamming_candidates,
+    l2_normalize_rows,
+    sign_bits,
+    top_k_indices
+)
+
+try:
+    import orjson
+    
+    def _json_dumps(value) -> str:
+        """Serialize to JSON text; numpy values in metadata are handled natively."""
+        return orjson.dumps(
+            value,
+            option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        ).decode()
+    
+    _json_loads = orjson.loads
+except ImportError:
+    # orjson not installed, fall back to the standard library codec
+    _json_dumps = json.dumps
+    _json_loads = json.loads
 
 # Register UUID adapter for psycopg2
 register_uuid()
 
+# Decode json/jsonb columns (songs.metadata) with the faster codec
+register_default_json(globally=True, loads=_json_loads)
+register_default_jsonb(globally=True, loads=_json_loads)
+
+
+def _cast_vector(value, cursor):
+    """Decode pgvector's text form ('[0.1,0.2,...]') straight to float32."""
+    if value is None:
+        return None
+    return np.fromstring(value[1:-1], sep=',', dtype=np.float32)
+
+
+@lru_cache(maxsize=4)
+def _vector_format(dimension: int) -> str:
+    """printf template for a pgvector literal of the given dimension."""
+    return '[' + ','.join(['%.8g'] * dimension) + ']'
+
+
+def format_vector(embedding) -> str:
+    """
+    Encode an embedding as pgvector text input ('[0.1,0.2,...]').
+    
+    Values are formatted as float32 (8 significant digits) in a single
+    string-format call, which is shorter on the wire than the float64
+    reprs psycopg2 emits for a Python list.
+    """
+    values = np.asarray(embedding, dtype=np.float32).ravel()
+    return _vector_format(len(values)) % tuple(values.tolist())
+
+
+class Vector:
+    """
+    An embedding passed as a query parameter, sent as a pgvector literal.
+    
+    Only values wrapped in this type are adapted, so other numpy arrays
+    (e.g. ID lists for ANY(%s)) keep psycopg2's default handling.
+    """
+    
+    __slots__ = ('values',)
+    
+    def __init__(self, values):
+        self.values = values
+
+
+def _adapt_vector(vector: Vector):
+    """psycopg2 adapter: Vector parameters are sent as pgvector literals."""
+    return AsIs("'%s'" % format_vector(vector.values))
+
+
+# Lets queries take numpy embeddings directly, with no list conversion
+register_adapter(Vector, _adapt_vector)
+
+@lru_cache(maxsize=1 << 16)
+def _parse_uuid(value: str) -> uuid.UUID:
+    return uuid.UUID(value)
+
+
+def _to_uuid(song_id) -> uuid.UUID:
+    """
+    Convert a song_id (string or UUID) to a UUID.
+    
+    Parsed strings are memoized: the same IDs are converted again and again
+    as songs move through metadata, embedding and search calls.
+    """
+    if isinstance(song_id, uuid.UUID):
+        return song_id
+    return _parse_uuid(str(song_id))
+
+
+@lru_cache(maxsize=1 << 16)
+def _uuid_str(value: uuid.UUID) -> str:
+    """Memoized str() of a UUID read back from the database."""
+    return str(value)
+
+
+# Song columns returned to callers. Internal columns such as search_vector
+# are never selected, so they are not serialized or sent over the wire.
+_SONG_FIELDS = (
+    'song_id', 'filename', 'artist', 'title', 'duration', 'genre', 'bpm',
+    'preview_url', 'track_id', 'collection_id', 'collection_name',
+    'artist_view_url', 'collection_view_url', 'track_view_url',
+    'artwork_url', 'release_date', 'track_time_millis',
+    'created_at', 'updated_at', 'metadata'
+)
+
+
+def _song_projection(fields=_SONG_FIELDS, alias: str = '') -> str:
+    """SELECT list for song columns, optionally qualified by a table alias."""
+    prefix = f'{alias}.' if alias else ''
+    return ', '.join(prefix + field for field in fields)
+
+
+_SONG_SELECT = _song_projection()
+_SONG_SELECT_S = _song_projection(alias='s')
+
+
+def _bulk_value(column: str, value):
+    """Wrap embeddings as pgvector and dicts as JSONB for insert_many."""
+    if column == 'embedding' and value is not None:
+        return Vector(value)
+    if isinstance(value, dict):
+        return Json(value, dumps=_json_dumps)
+    return value
+
+
+def _song_dict(row) -> Dict:
+    """Convert a songs row to a plain dict with a string song_id and parsed metadata."""
+    song = dict(row)
+    if song.get('song_id') is not None:
+        song['song_id'] = _uuid_str(song['song_id'])
+    if isinstance(song.get('metadata'), str):
+        song['metadata'] = _json_loads(song['metadata']) if song['metadata'] else {}
+    return song
+
 
 class PostgresStorageBackend(StorageBackend):
     """
@@ -24,6 +176,31 @@ class PostgresStorageBackend(StorageBackend):
     Uses pgvector extension for vector similarity search.
     """
     
+    # Rows per chunk in the client-side fallback scan (2048 x 512 int8 = 1 MB)
+    FALLBACK_SCAN_CHUNK = 2048
+    # int8 steps per unit in the fallback scan buffer; stored embeddings are
+    # unit-length, so every component lies in [-1, 1]
+    FALLBACK_QUANT_SCALE = 127.0
+    # Candidates per chunk kept by the sign-bit prefilter, as a multiple of k
+    FALLBACK_RERANK_FACTOR = 10
+    # HNSW candidate list per query: ANN_CANDIDATE_FACTOR * k, at least
+    # ANN_MIN_CANDIDATES and at most pgvector's limit of 1000
+    ANN_CANDIDATE_FACTOR = 20
+    ANN_MIN_CANDIDATES = 100
+    # Seconds get_distinct_genres serves its cached list
+    GENRES_CACHE_TTL = 300
+    # Page end keys remembered by list_songs for offset-style callers
+    PAGE_BOUNDARY_CACHE_SIZE = 256
+    # Tables insert_many writes to, mapped to their primary key column
+    BULK_TABLES = {
+        'songs': 'song_id',
+        'embeddings': 'embedding_id',
+    }
+    # Columns that need an explicit cast in insert_many's VALUES template
+    _BULK_COLUMN_CASTS = {
+        'embedding': '::vector',
+    }
+    
     def __init__(self, config: StorageConfig):
         """
         Initialize Postgres storage backend.
@@ -32,19 +209,38 @@ class PostgresStorageBackend(StorageBackend):
             config: StorageConfig instance with Postgres connection info
         """
         self.config = config
+        # (filters, offset) -> song_id of the row just before that offset
+        self._page_boundaries = OrderedDict()
+        # The backend is shared across threads (Streamlit, CLI worker pools)
+        self._page_boundaries_lock = threading.Lock()
+        # (monotonic time fetched, genres) for get_distinct_genres
+        self._genres_cache: Optional[Tuple[float, List[str]]] = None
+        # Genres known to be in the genres table (None until first needed)
+        self._known_genres: Optional[Set[str]] = None
+        # Remembers recent not-found lookups so repeated misses skip the database
+        self._cache = StorageCache()
         
         # Build connection string
         self.conn_string = self._build_connection_string()
+    
+    @cached_property
+    def pool(self) -> ThreadedConnectionPool:
+        """
+        Connection pool, created on first database access.
         
-        # Create connection pool
-        self.pool = ThreadedConnectionPool(
+        Deferring this keeps constructing the backend free of network
+        calls; the schema check runs once, when the pool is created.
+        """
+        pool = ThreadedConnectionPool(
             minconn=1,
-            maxconn=10,
+            maxconn=self.config.postgres_pool_size,
             dsn=self.conn_string
         )
         
         # Initialize schema if needed
-        self._ensure_schema()
+        self._ensure_schema(pool)
+        self._register_vector_type(pool)
+        return pool
     
     def _build_connection_string(self) -> str:
         """Build Postgres connection string from config."""
@@ -73,53 +269,69 @@ class PostgresStorageBackend(StorageBackend):
         """Return connection to pool."""
         self.pool.putconn(conn)
     
-    def _ensure_schema(self):
-        """Ensure database schema exists, including search indexes."""
-        conn = self._get_connection()
+    def _ensure_schema(self, pool: ThreadedConnectionPool):
+        """Ensure database schema exists, including search and vector indexes."""
+        conn = pool.getconn()
         try:
             with conn.cursor() as cur:
-                # Check and create extensions
+                # Check and create extensions (one lookup for all of them)
                 extensions = [
                     ('vector', 'vector'),
                     ('uuid-ossp', 'uuid-ossp'),
                     ('pg_trgm', 'pg_trgm')
                 ]
                 
+                cur.execute(
+                    "SELECT extname FROM pg_extension WHERE extname = ANY(%s)",
+                    ([ext_name for ext_name, _ in extensions],)
+                )
+                installed_extensions = {row[0] for row in cur.fetchall()}
+                
                 for ext_name, ext_sql in extensions:
-                    cur.execute("""
-                        SELECT EXISTS(
-                            SELECT 1 FROM pg_extension 
-                            WHERE extname = %s
-                        )
-                    """, (ext_name,))
-                    has_ext = cur.fetchone()[0]
-                    
-                    if not has_ext:
+                    if ext_name not in installed_extensions:
                         cur.execute(f'CREATE EXTENSION IF NOT EXISTS "{ext_sql}"')
                         conn.commit()
                         print(f"✓ Created {ext_name} extension")
                 
-                # Check if search_vector column exists
-                cur.execute("""
-                    SELECT EXISTS(
-                        SELECT 1 FROM information_schema.columns
-                        WHERE table_name = 'songs' AND column_name = 'search_vector'
-                    )
-                """)
-                has_search_vector = cur.fetchone()[0]
-                
-                if not has_search_vector:
-                    # Add search_vector column
-                    cur.execute("""
+                # Check and create generated search columns (one lookup for all)
+                columns_to_create = [
+                    ('search_vector', """
                         ALTER TABLE songs
                         ADD COLUMN search_vector tsvector
                             GENERATED ALWAYS AS (
                                 setweight(to_tsvector('english', COALESCE(title, '')), 'A') ||
                                 setweight(to_tsvector('english', COALESCE(artist, '')), 'B')
                             ) STORED
+                    """),
+                    # Lowercased artist/title/filename, so find_song_id can
+                    # match all three with one trigram-indexed LIKE
+                    ('search_blob', """
+                        ALTER TABLE songs
+                        ADD COLUMN search_blob text
+                            GENERATED ALWAYS AS (
+                                lower(
+                                    COALESCE(artist, '') || E'\\n' ||
+                                    COALESCE(title, '') || E'\\n' ||
+                                    COALESCE(filename, '')
+                                )
+                            ) STORED
                     """)
-                    conn.commit()
-                    print("✓ Created search_vector column")
+                ]
+                
+                cur.execute(
+                    """
+                    SELECT column_name FROM information_schema.columns
+                    WHERE table_name = 'songs' AND column_name = ANY(%s)
+                    """,
+                    ([column for column, _ in columns_to_create],)
+                )
+                existing_columns = {row[0] for row in cur.fetchall()}
+                
+                for column, column_sql in columns_to_create:
+                    if column not in existing_columns:
+                        cur.execute(column_sql)
+                        conn.commit()
+                        print(f"✓ Created {column} column")
                 
                 # Check and create search indexes
                 indexes_to_create = [
@@ -138,19 +350,46 @@ class PostgresStorageBackend(StorageBackend):
                     ('idx_song_title_artist_trgm', """
                         CREATE INDEX IF NOT EXISTS idx_song_title_artist_trgm
                         ON songs USING GIN ((title || ' ' || COALESCE(artist, '')) gin_trgm_ops)
+                    """),
+                    ('idx_songs_search_blob_trgm', """
+                        CREATE INDEX IF NOT EXISTS idx_songs_search_blob_trgm
+                        ON songs USING GIN (search_blob gin_trgm_ops)
+                    """),
+                    # Keyset pagination in list_songs
+                    ('idx_songs_created_at_song_id', """
+                        CREATE INDEX IF NOT EXISTS idx_songs_created_at_song_id
+                        ON songs (created_at, song_id)
+                    """),
+                    # Exact-match lookups in find_song_id
+                    ('idx_songs_filename', """
+                        CREATE INDEX IF NOT EXISTS idx_songs_filename
+                        ON songs (filename)
+                    """),
+                    ('idx_songs_preview_url', """
+                        CREATE INDEX IF NOT EXISTS idx_songs_preview_url
+                        ON songs (preview_url)
+                    """),
+                    ('idx_songs_metadata_path', """
+                        CREATE INDEX IF NOT EXISTS idx_songs_metadata_path
+                        ON songs ((metadata->>'path'))
+                    """),
+                    # ANN index for search_similar; without it every query is
+                    # an exact scan of the embeddings table
+                    ('idx_embeddings_vector', """
+                        CREATE INDEX IF NOT EXISTS idx_embeddings_vector
+                        ON embeddings USING hnsw (embedding vector_cosine_ops)
+                        WITH (m = 16, ef_construction = 64)
                     """)
                 ]
                 
+                cur.execute(
+                    "SELECT indexname FROM pg_indexes WHERE indexname = ANY(%s)",
+                    ([idx_name for idx_name, _ in indexes_to_create],)
+                )
+                existing_indexes = {row[0] for row in cur.fetchall()}
+                
                 for idx_name, idx_sql in indexes_to_create:
-                    cur.execute("""
-                        SELECT EXISTS(
-                            SELECT 1 FROM pg_indexes
-                            WHERE indexname = %s
-                        )
-                    """, (idx_name,))
-                    has_idx = cur.fetchone()[0]
-                    
-                    if not has_idx:
+                    if idx_name not in existing_indexes:
                         cur.execute(idx_sql)
                         conn.commit()
                         print(f"✓ Created {idx_name} index")
@@ -159,7 +398,36 @@ class PostgresStorageBackend(StorageBackend):
             print(f"Error ensuring schema: {e}")
             conn.rollback()
         finally:
-            self._put_connection(conn)
+            pool.putconn(conn)
+    
+    def _register_vector_type(self, pool: ThreadedConnectionPool):
+        """Have psycopg2 return vector columns as float32 numpy arrays."""
+        conn = pool.getconn()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT oid FROM pg_type WHERE typname = 'vector'")
+                row = cur.fetchone()
+            if row:
+                psycopg2.extensions.register_type(
+                    psycopg2.extensions.new_type((row[0],), 'VECTOR', _cast_vector)
+                )
+        except Exception as e:
+            print(f"Error registering vector type: {e}")
+            conn.rollback()
+        finally:
+            pool.putconn(conn)
+    
+    def _bump_data_version(self):
+        """Count a write and forget page boundaries, which it may have shifted."""
+        super()._bump_data_version()
+        with self._page_boundaries_lock:
+            self._page_boundaries.clear()
+    
+    def _stored(self, song_ids):
+        """Forget cached not-found results for songs that were just written."""
+        self._bump_data_version()
+        for song_id in song_ids:
+            self._cache.clear_missing(_uuid_str(_to_uuid(song_id)))
     
     def _generate_song_id(self) -> str:
         """Generate a new UUID for song ID."""
@@ -184,6 +452,7 @@ class PostgresStorageBackend(StorageBackend):
         artist = parts[0] if len(parts) > 0 else "Unknown"
         title = parts[1] if len(parts) > 1 else filename
         
+        now = datetime.now(timezone.utc)
         conn = self._get_connection()
         try:
             with conn.cursor() as cur:
@@ -194,11 +463,11 @@ class PostgresStorageBackend(StorageBackend):
                     ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     ON CONFLICT (song_id) DO NOTHING
                 """, (
-                    uuid.UUID(song_id), filename, artist, title, None, None,
-                    None, datetime.now(timezone.utc), datetime.now(timezone.utc),
-                    json.dumps({})
+                    _to_uuid(song_id), filename, artist, title, None, None,
+                    None, now, now, '{}'
                 ))
                 conn.commit()
+            self._stored([song_id])
             return song_id
         except Exception as e:
             conn.rollback()
@@ -207,6 +476,17 @@ class PostgresStorageBackend(StorageBackend):
         finally:
             self._put_connection(conn)
     
+    @cached_property
+    def _http(self):
+        """
+        Keep-alive HTTP session for preview downloads, created on first use.
+        
+        Reusing pooled connections skips a TCP and TLS handshake per file;
+        transient 429/5xx responses are retried with backoff.
+        """
+        from src.apple_api.client import create_session
+        return create_session()
+    
     def download_audio(self, song_id: str, local_path: str) -> bool:
         """
         Download audio file from preview_url.
@@ -218,18 +498,47 @@ class PostgresStorageBackend(StorageBackend):
             print(f"No preview_url found for song_id: {song_id}")
             return False
         
-        import requests
+        # Streams the body to disk in 1 MiB copies and removes partial files
+        from src.apple_api.downloader import download_preview
+        return download_preview(song['preview_url'], local_path, session=self._http)
+    
+    def download_audio_many(self, items: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Download several audio files concurrently.
+        
+        Preview URLs are looked up in one query and the files are fetched
+        on a single event loop with shared keep-alive connections.
+        """
+        if not items:
+            return []
+        
+        conn = self._get_connection()
         try:
-            response = requests.get(song['preview_url'], stream=True)
-            response.raise_for_status()
-            
-            with open(local_path, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            return True
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT song_id, preview_url FROM songs WHERE song_id = ANY(%s::uuid[])",
+                    ([str(song_id) for song_id, _ in items],)
+                )
+                urls = {str(song_id): url for song_id, url in cur.fetchall() if url}
         except Exception as e:
-            print(f"Error downloading audio: {e}")
-            return False
+            print(f"Error looking up preview URLs: {e}")
+            return [False] * len(items)
+        finally:
+            self._put_connection(conn)
+        
+        downloads = []
+        for song_id, local_path in items:
+            if str(song_id) in urls:
+                downloads.append((urls[str(song_id)], local_path))
+            else:
+                print(f"No preview_url found for song_id: {song_id}")
+        
+        from src.apple_api.downloader import download_previews
+        succeeded = iter(download_previews(downloads))
+        return [
+            next(succeeded) if str(song_id) in urls else False
+            for song_id, _ in items
+        ]
     
     def get_audio_url(self, song_id: str, expires_in: int = 3600) -> Optional[str]:
         """Get audio file URL."""
@@ -240,14 +549,12 @@ class PostgresStorageBackend(StorageBackend):
     
     def delete_audio(self, song_id: str) -> bool:
         """Delete song and related data (CASCADE handles related records)."""
-        # Ensure song_id is a string (handle UUID objects)
-        if isinstance(song_id, uuid.UUID):
-            song_id = str(song_id)
         conn = self._get_connection()
         try:
             with conn.cursor() as cur:
-                cur.execute("DELETE FROM songs WHERE song_id = %s", (uuid.UUID(song_id),))
+                cur.execute("DELETE FROM songs WHERE song_id = %s", (_to_uuid(song_id),))
                 conn.commit()
+                self._bump_data_version()
                 return cur.rowcount > 0
         except Exception as e:
             conn.rollback()
@@ -263,21 +570,25 @@ class PostgresStorageBackend(StorageBackend):
         model_name: str = "laion/clap-htsat-unfused"
     ) -> bool:
         """Store embedding in Postgres using pgvector."""
-        # Ensure song_id is a string (handle UUID objects)
-        if isinstance(song_id, uuid.UUID):
-            song_id = str(song_id)
-        
         embedding_id = uuid.uuid4()
-        song_uuid = uuid.UUID(song_id)
+        song_uuid = _to_uuid(song_id)
         
-        # Convert numpy array to list for pgvector
-        # pgvector accepts Python lists directly
-        embedding_list = embedding.tolist()
+        # Store unit-length float32 vectors so similarity is a plain dot
+        # product; the copy is normalized in place
+        embedding = np.array(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(embedding)
+        if norm > 0:
+            embedding /= norm
         
         conn = self._get_connection()
         try:
             with conn.cursor() as cur:
-                # Use pgvector format: pass list and cast to vector type
+                # Replace any previous vector for this song and model
+                cur.execute(
+                    "DELETE FROM embeddings WHERE song_id = %s AND model_name = %s",
+                    (song_uuid, model_name)
+                )
+                # Wrapped so the numpy array is adapted to a pgvector literal
                 cur.execute("""
                     INSERT INTO embeddings (
                         embedding_id, song_id, embedding, model_name, created_at
@@ -286,10 +597,11 @@ class PostgresStorageBackend(StorageBackend):
                         embedding = EXCLUDED.embedding,
                         model_name = EXCLUDED.model_name
                 """, (
-                    embedding_id, song_uuid, embedding_list,
+                    embedding_id, song_uuid, Vector(embedding),
                     model_name, datetime.now(timezone.utc)
                 ))
                 conn.commit()
+                self._stored([song_uuid])
                 return True
         except Exception as e:
             conn.rollback()
@@ -298,12 +610,64 @@ class PostgresStorageBackend(StorageBackend):
         finally:
             self._put_connection(conn)
     
+    def _insert_embedding_rows(self, cur, song_ids, embeddings, model_name, now):
+        """Insert a batch of embeddings on an open cursor, without committing."""
+        # Same unit-norm invariant as store_embedding, applied to the whole
+        # batch as one float32 matrix instead of row by row
+        matrix = l2_normalize_rows(np.array(embeddings, dtype=np.float32))
+        song_uuids = [_to_uuid(song_id) for song_id in song_ids]
+        rows = [
+            (uuid.uuid4(), song_uuid, Vector(embedding), model_name, now)
+            for song_uuid, embedding in zip(song_uuids, matrix)
+        ]
+        # Re-embedded songs replace their previous vector for this model, so
+        # searches never see a song twice or read a stale embedding
+        cur.execute(
+            "DELETE FROM embeddings WHERE song_id = ANY(%s::uuid[]) AND model_name = %s",
+            ([str(song_uuid) for song_uuid in song_uuids], model_name)
+        )
+        execute_values(
+            cur,
+            """
+            INSERT INTO embeddings (
+                embedding_id, song_id, embedding, model_name, created_at
+            ) VALUES %s
+            """,
+            rows,
+            template="(%s, %s, %s::vector, %s, %s)"
+        )
+    
+    def store_embeddings_batch(
+        self,
+        song_ids: List[str],
+        embeddings: List[np.ndarray],
+        model_name: str = "laion/clap-htsat-unfused"
+    ) -> bool:
+        """Store many embeddings with one multi-row INSERT."""
+        if not song_ids:
+            return True
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                self._insert_embedding_rows(
+                    cur, song_ids, embeddings, model_name, datetime.now(timezone.utc)
+                )
+                conn.commit()
+                self._stored(song_ids)
+                return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error storing embeddings batch: {e}")
+            return False
+        finally:
+            self._put_connection(conn)
+    
     def get_embedding(self, song_id: str) -> Optional[np.ndarray]:
         """Get embedding from Postgres."""
-        # Ensure song_id is a string (handle UUID objects)
-        if isinstance(song_id, uuid.UUID):
-            song_id = str(song_id)
-        song_uuid = uuid.UUID(song_id)
+        song_uuid = _to_uuid(song_id)
+        if self._cache.is_missing_embedding(_uuid_str(song_uuid)):
+            return None
         
         conn = self._get_connection()
         try:
@@ -319,13 +683,15 @@ class PostgresStorageBackend(StorageBackend):
                 if result and result[0] is not None:
                     # pgvector returns as list or array-like object
                     embedding_data = result[0]
+                    if isinstance(embedding_data, np.ndarray):
+                        # Decoded by the registered vector typecaster
+                        return embedding_data
                     if isinstance(embedding_data, (list, tuple)):
-                        return np.array(embedding_data)
+                        return np.asarray(embedding_data, dtype=np.float32)
                     else:
-                        # Fallback: convert string representation
-                        embedding_str = str(embedding_data).strip('[]')
-                        embedding_list = [float(x.strip()) for x in embedding_str.split(',')]
-                        return np.array(embedding_list)
+                        # Fallback: parse the text representation in C
+                        return _cast_vector(str(embedding_data), cur)
+                self._cache.mark_missing_embedding(_uuid_str(song_uuid))
                 return None
         except Exception as e:
             print(f"Error getting embedding: {e}")
@@ -333,6 +699,82 @@ class PostgresStorageBackend(StorageBackend):
         finally:
             self._put_connection(conn)
     
+    def get_embeddings(self, song_ids: List[str]) -> Tuple[List[str], np.ndarray]:
+        """Get the latest embedding for several songs in one query."""
+        song_ids = [str(song_id) for song_id in song_ids]
+        if not song_ids:
+            return [], np.empty((0, 0), dtype=np.float32)
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT DISTINCT ON (song_id) song_id, embedding
+                    FROM embeddings
+                    WHERE song_id = ANY(%s::uuid[])
+                    ORDER BY song_id, created_at DESC
+                """, (song_ids,))
+                rows = {
+                    _uuid_str(song_id): embedding
+                    for song_id, embedding in cur.fetchall()
+                    if embedding is not None
+                }
+        except Exception as e:
+            print(f"Error getting embeddings: {e}")
+            return [], np.empty((0, 0), dtype=np.float32)
+        finally:
+            self._put_connection(conn)
+        
+        # Write rows straight into one preallocated matrix, in input order
+        found_ids = [song_id for song_id in song_ids if song_id in rows]
+        if not found_ids:
+            return [], np.empty((0, 0), dtype=np.float32)
+        embeddings = np.empty((len(found_ids), len(rows[found_ids[0]])), dtype=np.float32)
+        for i, song_id in enumerate(found_ids):
+            embeddings[i] = rows[song_id]
+        return found_ids, embeddings
+    
+    def get_all_embeddings_with_metadata(
+        self,
+        limit: Optional[int] = None
+    ) -> Tuple[List[str], np.ndarray, List[Dict]]:
+        """Get the latest embedding of every song, joined with its metadata."""
+        query = f"""
+            SELECT DISTINCT ON (e.song_id) {_SONG_SELECT_S}, e.embedding
+            FROM embeddings e
+            JOIN songs s ON s.song_id = e.song_id
+            WHERE e.embedding IS NOT NULL
+            ORDER BY e.song_id, e.created_at DESC
+        """
+        params = []
+        if limit is not None:
+            query += " LIMIT %s"
+            params.append(limit)
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute(query, params)
+                rows = cur.fetchall()
+        except Exception as e:
+            print(f"Error getting embeddings with metadata: {e}")
+            return [], np.empty((0, 0), dtype=np.float32), []
+        finally:
+            self._put_connection(conn)
+        
+        if not rows:
+            return [], np.empty((0, 0), dtype=np.float32), []
+        
+        song_ids = []
+        metadata = []
+        embeddings = np.empty((len(rows), len(rows[0]['embedding'])), dtype=np.float32)
+        for i, row in enumerate(rows):
+            song = _song_dict(row)
+            embeddings[i] = song.pop('embedding')
+            song_ids.append(song['song_id'])
+            metadata.append(song)
+        return song_ids, embeddings, metadata
+    
     def search_similar(
         self,
         query_embedding: np.ndarray,
@@ -340,58 +782,171 @@ class PostgresStorageBackend(StorageBackend):
         threshold: Optional[float] = None
     ) -> List[Dict]:
         """Search for similar embeddings using pgvector cosine similarity."""
-        # Convert numpy array to list for pgvector
-        embedding_list = query_embedding.tolist()
+        # Normalize once, up front; both the server query and the
+        # client-side fallback use this copy
+        query = np.ascontiguousarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            # Cosine similarity is undefined for a zero vector
+            return []
+        query = query / norm
         
         conn = self._get_connection()
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                # Use pgvector cosine distance (1 - cosine similarity)
-                # Order by distance ascending (most similar first)
-                query = """
-                    SELECT 
-                        embedding_id,
-                        song_id,
-                        1 - (embedding <=> %s::vector) as similarity
-                    FROM embeddings
-                    WHERE embedding IS NOT NULL
-                """
-                
-                params = [embedding_list]
-                
-                if threshold is not None:
-                    # Filter by similarity threshold
-                    # similarity >= threshold means distance <= (1 - threshold)
-                    query += " AND (1 - (embedding <=> %s::vector)) >= %s"
-                    params.extend([embedding_list, threshold])
+                # Widen the HNSW search beyond its default of 40 candidates so
+                # recall holds up for larger k. is_local scopes the setting to
+                # this transaction, which the pool rolls back on return.
+                ef_search = min(max(self.ANN_CANDIDATE_FACTOR * k, self.ANN_MIN_CANDIDATES), 1000)
+                cur.execute("SELECT set_config('hnsw.ef_search', %s, true)", (str(ef_search),))
                 
-                query += " ORDER BY embedding <=> %s::vector LIMIT %s"
-                params.extend([embedding_list, k])
-                
-                cur.execute(query, params)
+                # Use pgvector cosine distance (1 - cosine similarity), computed
+                # once per row and ordered by the index (most similar first).
+                # The song rows are joined onto the k hits in the same query,
+                # so there is no second round trip for metadata.
+                cur.execute(f"""
+                    SELECT
+                        nn.embedding_id AS _embedding_id,
+                        nn.song_id AS _song_id,
+                        nn.distance AS _distance,
+                        {_SONG_SELECT_S}
+                    FROM (
+                        SELECT embedding_id, song_id, embedding <=> %s::vector AS distance
+                        FROM embeddings
+                        WHERE embedding IS NOT NULL
+                        ORDER BY distance
+                        LIMIT %s
+                    ) nn
+                    LEFT JOIN songs s ON s.song_id = nn.song_id
+                    ORDER BY nn.distance
+                """, (Vector(query), k))
                 results = cur.fetchall()
-                
-                # Enrich with metadata in batch (fixes N+1 query problem)
-                song_ids = [str(row['song_id']) for row in results]
-                metadata_map = self._batch_get_metadata(song_ids)
-                
-                enriched = []
-                for row in results:
-                    song_id = str(row['song_id'])
-                    item = {
-                        'embedding_id': str(row['embedding_id']),
-                        'song_id': song_id,
-                        'similarity': float(row['similarity']),
-                        'metadata': metadata_map.get(song_id, {})
-                    }
-                    enriched.append(item)
-                
-                return enriched
         except Exception as e:
+            conn.rollback()
             print(f"Error in vector search: {e}")
+            print("Falling back to client-side similarity scan")
+            results = None
+        finally:
+            self._put_connection(conn)
+        
+        if results is None:
+            # Runs after the failed connection is back in the pool, so the
+            # fallback never holds a second pool slot alongside it
+            return self._fallback_vector_search(query, k, threshold)
+        
+        similar = []
+        for row in results:
+            # Rows arrive best first, so thresholding the top k here matches
+            # filtering before the LIMIT
+            similarity = 1.0 - float(row.pop('_distance'))
+            if threshold is not None and similarity < threshold:
+                break
+            embedding_id = str(row.pop('_embedding_id'))
+            song_id = _uuid_str(row.pop('_song_id'))
+            similar.append({
+                'embedding_id': embedding_id,
+                'song_id': song_id,
+                'similarity': similarity,
+                # A missing song row leaves every joined column NULL
+                'metadata': dict(row) if row['song_id'] is not None else {}
+            })
+        return similar
+    
+    def _fallback_vector_search(
+        self,
+        query_embedding: np.ndarray,
+        k: int = 5,
+        threshold: Optional[float] = None
+    ) -> List[Dict]:
+        """
+        Cosine search computed client-side.
+        
+        Used when the pgvector query fails. Embeddings are streamed from a
+        server-side cursor in fixed-size chunks; each chunk is scored with
+        one matrix-vector product and merged into a running top-k heap, so
+        memory stays bounded by the chunk size rather than the library.
+        
+        Stored embeddings are unit-length (see store_embedding) and
+        search_similar passes a normalized float32 query, so scores are
+        plain dot products. Rows are scalar-quantized to int8 with a fixed
+        scale as they are read, which keeps scores within about 1e-2 of
+        the float32 values.
+        """
+        if k <= 0:
+            return []
+        
+        query = query_embedding
+        query_bits = sign_bits(query)
+        
+        # Chunk rows are quantized to int8, a quarter of their float32 size;
+        # the product itself is accumulated in float32
+        scale = self.FALLBACK_QUANT_SCALE
+        buffer = np.empty((self.FALLBACK_SCAN_CHUNK, len(query)), dtype=np.int8)
+        heap = []  # min-heap of (similarity, embedding_id, song_id)
+        
+        conn = self._get_connection()
+        try:
+            # A named cursor keeps the result set on the server
+            with conn.cursor(name='fallback_vector_scan') as cur:
+                cur.itersize = self.FALLBACK_SCAN_CHUNK
+                cur.execute("""
+                    SELECT embedding_id, song_id, embedding
+                    FROM embeddings
+                    WHERE embedding IS NOT NULL
+                """)
+                
+                while True:
+                    rows = cur.fetchmany(self.FALLBACK_SCAN_CHUNK)
+                    if not rows:
+                        break
+                    
+                    for i, row in enumerate(rows):
+                        buffer[i] = np.rint(np.asarray(row[2], dtype=np.float32) * scale)
+                    
+                    # Cheap Hamming prefilter on sign bits, then exact
+                    # re-ranking of the surviving candidates only
+                    chunk = buffer[:len(rows)]
+                    candidates = hamming_candidates(
+                        sign_bits(chunk), query_bits, self.FALLBACK_RERANK_FACTOR * k
+                    )
+                    sims = dot_scores(chunk[candidates].astype(np.float32), query) / scale
+                    
+                    # Winners arrive best first, so stop at the first one that
+                    # misses the threshold or cannot displace the heap minimum;
+                    # IDs are only touched for rows that enter the heap and are
+                    # converted to strings once, after the scan
+                    for j in top_k_indices(sims, k):
+                        similarity = float(sims[j])
+                        if threshold is not None and similarity < threshold:
+                            break
+                        if len(heap) == k and similarity <= heap[0][0]:
+                            break
+                        i = candidates[j]
+                        item = (similarity, rows[i][0], rows[i][1])
+                        if len(heap) < k:
+                            heapq.heappush(heap, item)
+                        else:
+                            heapq.heapreplace(heap, item)
+        except Exception as e:
+            conn.rollback()
+            print(f"Error in fallback vector search: {e}")
             return []
         finally:
             self._put_connection(conn)
+        
+        top = sorted(heap, reverse=True)
+        song_ids = [_uuid_str(song_id) for _, _, song_id in top]
+        metadata_map = self._batch_get_metadata(song_ids)
+        
+        return [
+            {
+                'embedding_id': str(embedding_id),
+                'song_id': song_id,
+                'similarity': similarity,
+                'metadata': metadata_map.get(song_id, {})
+            }
+            for (similarity, embedding_id, _), song_id in zip(top, song_ids)
+        ]
     
     def _batch_get_metadata(self, song_ids: List[str]) -> Dict[str, Dict]:
         """Batch load metadata for multiple song IDs."""
@@ -401,15 +956,15 @@ class PostgresStorageBackend(StorageBackend):
         conn = self._get_connection()
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("""
-                    SELECT * FROM songs
+                cur.execute(f"""
+                    SELECT {_SONG_SELECT} FROM songs
                     WHERE song_id = ANY(%s::uuid[])
                 """, (song_ids,))
                 
                 results = cur.fetchall()
                 metadata_map = {}
                 for row in results:
-                    song_id = str(row['song_id'])
+                    song_id = _uuid_str(row['song_id'])
                     metadata_map[song_id] = dict(row)
                 
                 return metadata_map
@@ -419,76 +974,91 @@ class PostgresStorageBackend(StorageBackend):
         finally:
             self._put_connection(conn)
     
+    _SONG_COLUMNS = """
+        song_id, filename, artist, title, duration, genre,
+        preview_url, track_id, collection_id, collection_name,
+        artist_view_url, collection_view_url, track_view_url,
+        artwork_url, release_date, track_time_millis,
+        updated_at, metadata
+    """
+    
+    _SONG_UPSERT = """
+        ON CONFLICT (song_id) DO UPDATE SET
+            filename = EXCLUDED.filename,
+            artist = EXCLUDED.artist,
+            title = EXCLUDED.title,
+            duration = EXCLUDED.duration,
+            genre = EXCLUDED.genre,
+            preview_url = EXCLUDED.preview_url,
+            track_id = EXCLUDED.track_id,
+            collection_id = EXCLUDED.collection_id,
+            collection_name = EXCLUDED.collection_name,
+            artist_view_url = EXCLUDED.artist_view_url,
+            collection_view_url = EXCLUDED.collection_view_url,
+            track_view_url = EXCLUDED.track_view_url,
+            artwork_url = EXCLUDED.artwork_url,
+            release_date = EXCLUDED.release_date,
+            track_time_millis = EXCLUDED.track_time_millis,
+            updated_at = EXCLUDED.updated_at,
+            metadata = EXCLUDED.metadata
+    """
+    
+    def _song_row(self, song_id, metadata: Dict, now: datetime) -> tuple:
+        """
+        Build a songs row (in _SONG_COLUMNS order) from a metadata dict.
+        
+        iTunes fields are read under their API name first, then under the
+        column name. Called once per song in bulk ingestion, so the dict's
+        get is bound once and the timestamp is passed in by the caller.
+        """
+        get = metadata.get
+        return (
+            _to_uuid(song_id),
+            get('filename', ''),
+            get('artist', ''),
+            get('title', ''),
+            get('duration'),
+            get('genre'),
+            get('preview_url', ''),
+            get('trackId') or get('track_id'),
+            get('collectionId') or get('collection_id'),
+            get('collectionName') or get('collection_name', ''),
+            get('artistViewUrl') or get('artist_view_url', ''),
+            get('collectionViewUrl') or get('collection_view_url', ''),
+            get('trackViewUrl') or get('track_view_url', ''),
+            get('artworkUrl') or get('artwork_url', ''),
+            get('releaseDate') or get('release_date', ''),
+            get('trackTimeMillis') or get('track_time_millis'),
+            now,
+            _json_dumps(get('metadata', {}))
+        )
+    
     def store_metadata(self, song_id: str, metadata: Dict) -> bool:
         """Store metadata in Postgres."""
-        # Ensure song_id is a string (handle UUID objects)
-        if isinstance(song_id, uuid.UUID):
-            song_id = str(song_id)
-        song_uuid = uuid.UUID(song_id)
-        
+        new_genres = self._new_genres([metadata.get('genre')])
         conn = self._get_connection()
         try:
             with conn.cursor() as cur:
                 # Update songs table
-                cur.execute("""
-                    INSERT INTO songs (
-                        song_id, filename, artist, title, duration, genre,
-                        preview_url, track_id, collection_id, collection_name,
-                        artist_view_url, collection_view_url, track_view_url,
-                        artwork_url, release_date, track_time_millis,
-                        updated_at, metadata
-                    ) VALUES (
-                        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                        %s, %s, %s, %s, %s, %s, %s, %s
-                    )
-                    ON CONFLICT (song_id) DO UPDATE SET
-                        filename = EXCLUDED.filename,
-                        artist = EXCLUDED.artist,
-                        title = EXCLUDED.title,
-                        duration = EXCLUDED.duration,
-                        genre = EXCLUDED.genre,
-                        preview_url = EXCLUDED.preview_url,
-                        track_id = EXCLUDED.track_id,
-                        collection_id = EXCLUDED.collection_id,
-                        collection_name = EXCLUDED.collection_name,
-                        artist_view_url = EXCLUDED.artist_view_url,
-                        collection_view_url = EXCLUDED.collection_view_url,
-                        track_view_url = EXCLUDED.track_view_url,
-                        artwork_url = EXCLUDED.artwork_url,
-                        release_date = EXCLUDED.release_date,
-                        track_time_millis = EXCLUDED.track_time_millis,
-                        updated_at = EXCLUDED.updated_at,
-                        metadata = EXCLUDED.metadata
-                """, (
-                    song_uuid,
-                    metadata.get('filename', ''),
-                    metadata.get('artist', ''),
-                    metadata.get('title', ''),
-                    metadata.get('duration'),
-                    metadata.get('genre'),
-                    metadata.get('preview_url', ''),
-                    metadata.get('trackId') or metadata.get('track_id'),
-                    metadata.get('collectionId') or metadata.get('collection_id'),
-                    metadata.get('collectionName') or metadata.get('collection_name', ''),
-                    metadata.get('artistViewUrl') or metadata.get('artist_view_url', ''),
-                    metadata.get('collectionViewUrl') or metadata.get('collection_view_url', ''),
-                    metadata.get('trackViewUrl') or metadata.get('track_view_url', ''),
-                    metadata.get('artworkUrl') or metadata.get('artwork_url', ''),
-                    metadata.get('releaseDate') or metadata.get('release_date', ''),
-                    metadata.get('trackTimeMillis') or metadata.get('track_time_millis'),
-                    datetime.now(timezone.utc),
-                    json.dumps(metadata.get('metadata', {}))
-                ))
+                cur.execute(
+                    f"INSERT INTO songs ({self._SONG_COLUMNS}) VALUES ("
+                    + ", ".join(["%s"] * 18)
+                    + f") {self._SONG_UPSERT}",
+                    self._song_row(song_id, metadata, datetime.now(timezone.utc))
+                )
             
-                # Update genres table
-                genre = metadata.get('genre')
-                if genre:
+                # Update genres table, unless the genre is already known
+                added_genre = False
+                if new_genres:
                     cur.execute("""
                         INSERT INTO genres (genre) VALUES (%s)
                         ON CONFLICT (genre) DO NOTHING
-                    """, (genre,))
+                    """, (new_genres[0],))
+                    added_genre = cur.rowcount > 0
                 
                 conn.commit()
+                self._remember_genres(new_genres, added_genre)
+                self._stored([song_id])
                 return True
         except Exception as e:
             conn.rollback()
@@ -497,31 +1067,259 @@ class PostgresStorageBackend(StorageBackend):
         finally:
             self._put_connection(conn)
     
+    def _new_genres(self, genres) -> List[str]:
+        """
+        Filter genres down to those not yet known to be in the genres table.
+        
+        The known set is loaded from get_distinct_genres and grows as this
+        process stores genres, so repeated genres in bulk ingestion never
+        reach the database. It is reloaded with the genre list, at least
+        every GENRES_CACHE_TTL seconds, so genres deleted elsewhere are
+        inserted again.
+        
+        Returns:
+            Sorted, de-duplicated list of possibly new genres
+        """
+        cached = self._genres_cache
+        if (
+            self._known_genres is None
+            or cached is None
+            or time.monotonic() - cached[0] >= self.GENRES_CACHE_TTL
+        ):
+            self._known_genres = set(self.get_distinct_genres())
+        return sorted({genre for genre in genres if genre} - self._known_genres)
+    
+    def _remember_genres(self, genres, added: bool):
+        """Record committed genres as known; invalidate the genre list if any were new."""
+        if self._known_genres is not None:
+            self._known_genres.update(genres)
+        if added:
+            self.invalidate_genres()
+    
+    def _upsert_song_rows(self, cur, records, now, genres) -> bool:
+        """
+        Upsert a batch of songs and the given genres on an open cursor, without committing.
+        
+        Returns:
+            True if a genre was added to the genres table
+        """
+        rows = [self._song_row(song_id, metadata, now) for song_id, metadata in records]
+        execute_values(
+            cur,
+            f"INSERT INTO songs ({self._SONG_COLUMNS}) VALUES %s {self._SONG_UPSERT}",
+            rows
+        )
+        if not genres:
+            return False
+        added = execute_values(
+            cur,
+            "INSERT INTO genres (genre) VALUES %s ON CONFLICT (genre) DO NOTHING RETURNING genre",
+            [(genre,) for genre in genres],
+            fetch=True
+        )
+        return bool(added)
+    
+    def store_metadata_batch(self, records: List[Tuple[str, Dict]]) -> bool:
+        """Store metadata for many songs with one multi-row upsert."""
+        if not records:
+            return True
+        
+        genres = self._new_genres(metadata.get('genre') for _, metadata in records)
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                added_genres = self._upsert_song_rows(
+                    cur, records, datetime.now(timezone.utc), genres
+                )
+                conn.commit()
+                self._remember_genres(genres, added_genres)
+                self._stored(song_id for song_id, _ in records)
+                return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error storing metadata batch: {e}")
+            return False
+        finally:
+            self._put_connection(conn)
+    
+    def store_songs_batch(
+        self,
+        records: List[Tuple[str, Dict]],
+        embeddings: List[np.ndarray],
+        model_name: str = "laion/clap-htsat-unfused"
+    ) -> bool:
+        """Store songs, genres and embeddings in a single transaction."""
+        if not records:
+            return True
+        
+        now = datetime.now(timezone.utc)
+        genres = self._new_genres(metadata.get('genre') for _, metadata in records)
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                # Songs first: the embeddings rows reference them
+                added_genres = self._upsert_song_rows(cur, records, now, genres)
+                self._insert_embedding_rows(
+                    cur, [song_id for song_id, _ in records], embeddings, model_name, now
+                )
+                conn.commit()
+                self._remember_genres(genres, added_genres)
+                self._stored(song_id for song_id, _ in records)
+                return True
+        except Exception as e:
+            conn.rollback()
+            print(f"Error storing songs batch: {e}")
+            return False
+        finally:
+            self._put_connection(conn)
+    
+    def _insert_chunk(self, table: str, columns: List[str], chunk: List[Dict]) -> List[Dict]:
+        """Insert one chunk of rows with a single multi-row INSERT, returning the new rows."""
+        template = "(" + ", ".join(
+            f"%({col})s{self._BULK_COLUMN_CASTS.get(col, '')}" for col in columns
+        ) + ")"
+        values = [
+            {col: _bulk_value(col, row.get(col)) for col in columns}
+            for row in chunk
+        ]
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                inserted = execute_values(
+                    cur,
+                    f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s "
+                    f"ON CONFLICT ({self.BULK_TABLES[table]}) DO NOTHING "
+                    f"RETURNING {', '.join(columns)}",
+                    values,
+                    template=template,
+                    page_size=len(values),
+                    fetch=True
+                )
+                conn.commit()
+                return [dict(row) for row in inserted]
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._put_connection(conn)
+    
+    def insert_genres(self, genres) -> None:
+        """
+        Add genres to the genres table with a single multi-row INSERT.
+        
+        Args:
+            genres (iterable): Genre names; empty values and duplicates are ignored
+        """
+        # Genres this backend already knows are stored never reach the database
+        genres = self._new_genres(genres)
+        if not genres:
+            return
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                added = execute_values(
+                    cur,
+                    "INSERT INTO genres (genre) VALUES %s ON CONFLICT (genre) DO NOTHING RETURNING genre",
+                    [(genre,) for genre in genres],
+                    page_size=500,
+                    fetch=True
+                )
+                conn.commit()
+            self._remember_genres(genres, bool(added))
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self._put_connection(conn)
+    
+    def insert_many(
+        self,
+        table: str,
+        rows: List[Dict],
+        chunk_size: int = 20,
+        concurrency: int = 8
+    ) -> List[Dict]:
+        """
+        Insert rows in chunks, with chunks written concurrently.
+        
+        Each chunk is one INSERT statement, so N rows cost N / chunk_size round
+        trips instead of N. Song rows whose track_id is already stored are
+        dropped up front with one indexed lookup, and their genres are added
+        to the genres table afterwards.
+        
+        Args:
+            table (str): Target table, one of BULK_TABLES
+            rows (list): Row dicts keyed by column name (same keys in every row)
+            chunk_size (int): Rows per INSERT statement
+            concurrency (int): Maximum chunks in flight at once
+            
+        Returns:
+            list: The rows actually inserted, as returned by the database
+            (rows whose key already existed are left out)
+        """
+        if table not in self.BULK_TABLES:
+            raise ValueError(f"Bulk insert not supported for table: {table}")
+        
+        if table == 'songs':
+            track_ids = list({row['track_id'] for row in rows if row.get('track_id')})
+            seen = set(self.get_existing_track_ids(track_ids))
+            unique_rows = []
+            for row in rows:
+                track_id = row.get('track_id')
+                if track_id:
+                    if track_id in seen:
+                        continue
+                    seen.add(track_id)
+                unique_rows.append(row)
+            rows = unique_rows
+        
+        if not rows:
+            return []
+        
+        columns = list(rows[0].keys())
+        chunks = [rows[i:i + chunk_size] for i in range(0, len(rows), chunk_size)]
+        
+        # The connection pool raises rather than blocks when exhausted, so keep
+        # workers below its size, leaving a connection for other callers
+        max_workers = max(1, min(concurrency, len(chunks), self.config.postgres_pool_size - 1))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            inserted = [
+                row
+                for chunk_rows in executor.map(
+                    lambda chunk: self._insert_chunk(table, columns, chunk), chunks
+                )
+                for row in chunk_rows
+            ]
+        
+        # Earlier lookups of these songs may have been cached as not found
+        self._stored(row['song_id'] for row in inserted if row.get('song_id'))
+        
+        if table == 'songs':
+            # store_metadata keeps genres in sync per song; do the same in bulk
+            self.insert_genres(row.get('genre') for row in inserted)
+        
+        return inserted
+    
     def get_metadata(self, song_id: str) -> Optional[Dict]:
         """Get metadata from Postgres."""
-        # Ensure song_id is a string (handle UUID objects)
-        if isinstance(song_id, uuid.UUID):
-            song_id = str(song_id)
-        song_uuid = uuid.UUID(song_id)
+        song_uuid = _to_uuid(song_id)
+        if self._cache.is_missing_metadata(_uuid_str(song_uuid)):
+            return None
         
         conn = self._get_connection()
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                cur.execute("SELECT * FROM songs WHERE song_id = %s", (song_uuid,))
+                cur.execute(
+                    f"SELECT {_SONG_SELECT} FROM songs WHERE song_id = %s",
+                    (song_uuid,)
+                )
                 result = cur.fetchone()
-                
-                if result:
-                    metadata = dict(result)
-                    # Convert UUIDs to strings
-                    if 'song_id' in metadata:
-                        metadata['song_id'] = str(metadata['song_id'])
-                    # Parse JSONB metadata
-                    if 'metadata' in metadata and isinstance(metadata['metadata'], dict):
-                        pass  # Already a dict
-                    elif 'metadata' in metadata:
-                        metadata['metadata'] = json.loads(metadata['metadata']) if metadata['metadata'] else {}
-                    return metadata
-                return None
+                if result is None:
+                    self._cache.mark_missing_metadata(_uuid_str(song_uuid))
+                    return None
+                return _song_dict(result)
         except Exception as e:
             print(f"Error getting metadata: {e}")
             return None
@@ -532,20 +1330,51 @@ class PostgresStorageBackend(StorageBackend):
         self,
         filters: Optional[Dict] = None,
         limit: Optional[int] = None,
-        skip: Optional[int] = None
+        skip: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[Sequence[str]] = None
     ) -> List[Dict]:
         """
         List songs with optional filters and pagination.
         
+        Songs are ordered by when they were added (created_at, then song_id
+        to break ties) and paged by key: pass the last song_id of the
+        previous page as `after` and the (created_at, song_id) index seeks
+        straight to the next page. Offset paging with `skip` is still
+        accepted; when the same filters were listed up to that offset
+        before, the remembered boundary key replaces the OFFSET scan.
+        
         Args:
             filters: Optional filters (e.g., {'artist': 'Taylor Swift'})
             limit: Maximum number of songs to return (default: 20)
             skip: Number of songs to skip (for pagination)
+            after: Only return songs listed after this song_id
+            fields: Columns to return (default: all song columns); song_id
+                is always included
         """
+        if fields is None:
+            fields = _SONG_FIELDS
+        else:
+            unknown = set(fields) - set(_SONG_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown song fields: {sorted(unknown)}")
+            fields = ('song_id',) + tuple(f for f in fields if f != 'song_id')
+        
+        filter_key = tuple(sorted((filters or {}).items()))
+        # Boundaries are offsets, so only offset-style calls can record them
+        by_offset = after is None
+        if skip and by_offset:
+            with self._page_boundaries_lock:
+                after = self._page_boundaries.get((filter_key, skip))
+                if after is not None:
+                    self._page_boundaries.move_to_end((filter_key, skip))
+        remembered = by_offset and after is not None
+        offset = skip if after is None else None
+        
         conn = self._get_connection()
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
-                query = "SELECT * FROM songs WHERE 1=1"
+                query = f"SELECT {_song_projection(fields)} FROM songs WHERE 1=1"
                 params = []
                 
                 # Apply filters
@@ -559,16 +1388,30 @@ class PostgresStorageBackend(StorageBackend):
                     if 'title' in filters:
                         query += " AND title ILIKE %s"
                         params.append(f'%{filters["title"]}%')
+                    if 'track_id' in filters:
+                        query += " AND track_id = %s"
+                        params.append(filters['track_id'])
+                
+                if after is not None:
+                    # Position of the previous page's last song in the ordering
+                    query += """
+                        AND (created_at, song_id) > (
+                            SELECT created_at, song_id FROM songs WHERE song_id = %s
+                        )
+                    """
+                    params.append(_to_uuid(after))
                 
                 # Apply pagination
                 if limit is None:
                     limit = 20
                 
-                if skip:
-                    query += f" OFFSET %s"
-                    params.append(skip)
+                query += " ORDER BY created_at, song_id"
+                
+                if offset:
+                    query += " OFFSET %s"
+                    params.append(offset)
                 
-                query += f" LIMIT %s"
+                query += " LIMIT %s"
                 params.append(limit)
                 
                 cur.execute(query, params)
@@ -576,19 +1419,85 @@ class PostgresStorageBackend(StorageBackend):
                 
                 songs = []
                 for row in results:
-                    song = dict(row)
-                    if 'song_id' in song:
-                        song['song_id'] = str(song['song_id'])
-                    if 'metadata' in song and isinstance(song['metadata'], str):
-                        song['metadata'] = json.loads(song['metadata']) if song['metadata'] else {}
+                    song = _song_dict(row)
                     songs.append(song)
                 
-                return songs
+                # Remember where this page ended so list_songs(skip=...) for
+                # the next page can seek instead of scanning
+                if songs and by_offset:
+                    boundary = (filter_key, (skip or 0) + len(songs))
+                    with self._page_boundaries_lock:
+                        self._page_boundaries[boundary] = songs[-1]['song_id']
+                        self._page_boundaries.move_to_end(boundary)
+                        if len(self._page_boundaries) > self.PAGE_BOUNDARY_CACHE_SIZE:
+                            self._page_boundaries.popitem(last=False)
+                
+                if songs or not remembered:
+                    return songs
+                
+                # An empty page may mean the remembered boundary row was
+                # deleted, which makes the keyset condition match nothing
+                cur.execute("SELECT 1 FROM songs WHERE song_id = %s", (_to_uuid(after),))
+                if cur.fetchone() is not None:
+                    return songs
+                with self._page_boundaries_lock:
+                    self._page_boundaries.pop((filter_key, skip), None)
         except Exception as e:
             print(f"Error listing songs: {e}")
             return []
         finally:
             self._put_connection(conn)
+        
+        # Boundary forgotten: list the page by OFFSET, after releasing the connection
+        return self.list_songs(filters, limit=limit, skip=skip, fields=fields)
+    
+    def get_existing_track_ids(self, track_ids: List[int]) -> set:
+        """
+        Return which of the given iTunes track IDs are already stored.
+        
+        One indexed query for the whole batch instead of a lookup per track.
+        
+        Args:
+            track_ids: iTunes track IDs to check
+        """
+        track_ids = [int(track_id) for track_id in track_ids if track_id]
+        if not track_ids:
+            return set()
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT DISTINCT track_id FROM songs WHERE track_id = ANY(%s)",
+                    (track_ids,)
+                )
+                return {row[0] for row in cur.fetchall()}
+        except Exception as e:
+            print(f"Error checking existing track IDs: {e}")
+            return set()
+        finally:
+            self._put_connection(conn)
+    
+    def get_file_signatures(self) -> Dict[str, Dict]:
+        """Get the path, mtime and size recorded in songs.metadata at embed time."""
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT song_id, metadata->>'path', metadata->>'mtime', metadata->>'size'
+                    FROM songs
+                    WHERE metadata ? 'mtime'
+                """)
+                return {
+                    path: {'song_id': str(song_id), 'mtime': float(mtime), 'size': int(size)}
+                    for song_id, path, mtime, size in cur.fetchall()
+                    if path
+                }
+        except Exception as e:
+            print(f"Error loading file signatures: {e}")
+            return {}
+        finally:
+            self._put_connection(conn)
     
     def find_song_id(
         self,
@@ -609,26 +1518,44 @@ class PostgresStorageBackend(StorageBackend):
         try:
             with conn.cursor() as cur:
                 if song_path:
-                    # Search by path in metadata table
+                    # Imported previews are keyed by URL, local files by the
+                    # path recorded in the metadata column; both are indexed
                     cur.execute("""
-                        SELECT song_id FROM metadata
-                        WHERE path = %s OR preview_url = %s
+                        SELECT song_id FROM songs
+                        WHERE preview_url = %s
+                           OR metadata->>'path' = %s
+                           OR filename = %s
                         LIMIT 1
-                    """, (song_path, song_path))
+                    """, (song_path, song_path, Path(song_path).name))
                     result = cur.fetchone()
                     if result:
                         return str(result[0])
                 
                 if song_name:
-                    # Search by name using ILIKE for case-insensitive search
-                    query_lower = song_name.lower()
+                    # Exact title or filename first: a bitmap OR of two index lookups
                     cur.execute("""
                         SELECT song_id FROM songs
-                        WHERE LOWER(filename) LIKE %s
-                           OR LOWER(title) LIKE %s
-                           OR LOWER(artist) LIKE %s
+                        WHERE title = %s OR filename = %s
                         LIMIT 1
-                    """, (f'%{query_lower}%', f'%{query_lower}%', f'%{query_lower}%'))
+                    """, (song_name, song_name))
+                    result = cur.fetchone()
+                    if result:
+                        return str(result[0])
+                    
+                    # Then a case-insensitive substring match on artist, title
+                    # and filename at once, through the search_blob trigram index
+                    # Escape LIKE wildcards so '_' and '%' in names match literally
+                    escaped = (
+                        song_name.lower()
+                        .replace('\\', '\\\\')
+                        .replace('%', '\\%')
+                        .replace('_', '\\_')
+                    )
+                    cur.execute("""
+                        SELECT song_id FROM songs
+                        WHERE search_blob LIKE %s ESCAPE '\\'
+                        LIMIT 1
+                    """, (f'%{escaped}%',))
                     result = cur.fetchone()
                     if result:
                         return str(result[0])
@@ -640,25 +1567,57 @@ class PostgresStorageBackend(StorageBackend):
         finally:
             self._put_connection(conn)
     
+    def invalidate_genres(self):
+        """Drop the cached genre list and known genres after the genres table changes."""
+        self._genres_cache = None
+        self._known_genres = None
+    
     def get_distinct_genres(self) -> List[str]:
         """
         Get all distinct genres from the genres table.
         
+        The list is cached for GENRES_CACHE_TTL seconds, and dropped early
+        whenever this process adds a genre.
+        
         Returns:
             Sorted list of unique genres
         """
+        cached = self._genres_cache
+        if cached is not None and time.monotonic() - cached[0] < self.GENRES_CACHE_TTL:
+            return list(cached[1])
+        
         conn = self._get_connection()
         try:
             with conn.cursor() as cur:
                 cur.execute("SELECT genre FROM genres ORDER BY genre")
                 results = cur.fetchall()
-                return [row[0] for row in results if row[0]]
+                genres = [row[0] for row in results if row[0]]
+                self._genres_cache = (time.monotonic(), genres)
+                # A fresh snapshot, so genres removed from the table are forgotten
+                self._known_genres = set(genres)
+                return list(genres)
         except Exception as e:
             print(f"Error getting genres: {e}")
             return []
         finally:
             self._put_connection(conn)
     
+    def get_song_genres(self) -> set:
+        """Get the distinct genres of all stored songs in one query."""
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT DISTINCT genre FROM songs
+                    WHERE genre IS NOT NULL AND genre <> ''
+                """)
+                return {row[0] for row in cur.fetchall()}
+        except Exception as e:
+            print(f"Error getting song genres: {e}")
+            return set()
+        finally:
+            self._put_connection(conn)
+    
     def get_database_stats(self) -> Dict:
         """
         Get comprehensive statistics from the entire database.
@@ -710,8 +1669,8 @@ class PostgresStorageBackend(StorageBackend):
                 top_genres = [(row['genre'], row['count']) for row in cur.fetchall()]
                 
                 # Get recent songs
-                cur.execute("""
-                    SELECT *
+                cur.execute(f"""
+                    SELECT {_SONG_SELECT}
                     FROM songs
                     ORDER BY created_at DESC
                     LIMIT 10
@@ -719,11 +1678,7 @@ class PostgresStorageBackend(StorageBackend):
                 recent_songs_raw = cur.fetchall()
                 recent_songs = []
                 for row in recent_songs_raw:
-                    song = dict(row)
-                    if 'song_id' in song:
-                        song['song_id'] = str(song['song_id'])
-                    if 'metadata' in song and isinstance(song['metadata'], str):
-                        song['metadata'] = json.loads(song['metadata']) if song['metadata'] else {}
+                    song = _song_dict(row)
                     recent_songs.append(song)
                 
                 return {
@@ -779,9 +1734,9 @@ class PostgresStorageBackend(StorageBackend):
                 if search_type == "autocomplete":
                     # Fast trigram search for autocomplete (partial matches)
                     # Uses similarity() function with trigram indexes for speed
-                    cur.execute("""
+                    cur.execute(f"""
                         SELECT 
-                            s.*,
+                            {_SONG_SELECT_S},
                             GREATEST(
                                 similarity(s.title, %s),
                                 similarity(s.artist, %s),
@@ -798,9 +1753,9 @@ class PostgresStorageBackend(StorageBackend):
                     
                 elif search_type == "trigram":
                     # Fuzzy search with trigrams (handles typos)
-                    cur.execute("""
+                    cur.execute(f"""
                         SELECT 
-                            s.*,
+                            {_SONG_SELECT_S},
                             GREATEST(
                                 similarity(s.title, %s),
                                 similarity(s.artist, %s)
@@ -815,9 +1770,9 @@ class PostgresStorageBackend(StorageBackend):
                     
                 elif search_type == "fts":
                     # Full-text search (exact/keyword matching)
-                    cur.execute("""
+                    cur.execute(f"""
                         SELECT 
-                            s.*,
+                            {_SONG_SELECT_S},
                             ts_rank(s.search_vector, plainto_tsquery('english', %s)) as score
                         FROM songs s
                         WHERE s.search_vector @@ plainto_tsquery('english', %s)
@@ -829,12 +1784,10 @@ class PostgresStorageBackend(StorageBackend):
                     # Hybrid: Combine FTS + trigram + optional vector
                     if query_embedding is not None:
                         # Full hybrid: FTS + trigram + vector similarity
-                        embedding_list = query_embedding.tolist()
-                        cur.execute("""
+                        cur.execute(f"""
                             WITH text_matches AS (
                                 SELECT 
-                                    s.song_id,
-                                    s.*,
+                                    {_SONG_SELECT_S},
                                     COALESCE(
                                         0.5 * ts_rank(s.search_vector, plainto_tsquery('english', %s)),
                                         0
@@ -871,13 +1824,13 @@ class PostgresStorageBackend(StorageBackend):
                             LIMIT %s
                         """, (
                             query, query, query, query, query, query,
-                            embedding_list, embedding_list, limit * 2, limit
+                            Vector(query_embedding), Vector(query_embedding), limit * 2, limit
                         ))
                     else:
                         # Text-only hybrid: FTS + trigram
-                        cur.execute("""
+                        cur.execute(f"""
                             SELECT 
-                                s.*,
+                                {_SONG_SELECT_S},
                                 COALESCE(
                                     0.6 * ts_rank(s.search_vector, plainto_tsquery('english', %s)),
                                     0
@@ -905,11 +1858,7 @@ class PostgresStorageBackend(StorageBackend):
                 results = cur.fetchall()
                 songs = []
                 for row in results:
-                    song = dict(row)
-                    if 'song_id' in song:
-                        song['song_id'] = str(song['song_id'])
-                    if 'metadata' in song and isinstance(song['metadata'], str):
-                        song['metadata'] = json.loads(song['metadata']) if song['metadata'] else {}
+                    song = _song_dict(row)
                     # Remove score from metadata if present (internal use only)
                     if 'score' in song:
                         song['_search_score'] = float(song['score'])
@@ -930,8 +1879,8 @@ class PostgresStorageBackend(StorageBackend):
         try:
             with conn.cursor(cursor_factory=RealDictCursor) as cur:
                 query_lower = f'%{query.lower()}%'
-                cur.execute("""
-                    SELECT * FROM songs
+                cur.execute(f"""
+                    SELECT {_SONG_SELECT} FROM songs
                     WHERE title ILIKE %s OR artist ILIKE %s
                     LIMIT %s
                 """, (query_lower, query_lower, limit))
@@ -939,11 +1888,7 @@ class PostgresStorageBackend(StorageBackend):
                 results = cur.fetchall()
                 songs = []
                 for row in results:
-                    song = dict(row)
-                    if 'song_id' in song:
-                        song['song_id'] = str(song['song_id'])
-                    if 'metadata' in song and isinstance(song['metadata'], str):
-                        song['metadata'] = json.loads(song['metadata']) if song['metadata'] else {}
+                    song = _song_dict(row)
                     songs.append(song)
                 
                 return songs
@@ -955,6 +1900,7 @@ class PostgresStorageBackend(StorageBackend):
     
     def close(self):
         """Close database connection pool."""
-        if self.pool:
+        # Only close a pool that was actually created
+        if 'pool' in self.__dict__:
             self.pool.closeall()
 
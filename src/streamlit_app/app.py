@@ -9,15 +9,6 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
-# Load environment variables
-try:
-    from dotenv import load_dotenv
-    env_path = project_root / '.env'
-    if env_path.exists():
-        load_dotenv(env_path)
-except ImportError:
-    pass
-
 from src.storage.factory import create_storage_backend
 from src.similarity.recommender import Recommender
 from src.streamlit_app.components.songCard import render_song_card
@@ -3,10 +3,31 @@ import umap
 from sklearn.manifold import TSNE
 
 class Projector:
-    def __init__(self, method='umap', n_components=2, random_state=42):
+    def __init__(
+        self,
+        method='umap',
+        n_components=2,
+        random_state=42,
+        n_neighbors=15,
+        min_dist=0.1,
+        n_jobs=-1
+    ):
+        """
+        Args:
+            method (str): 'umap' (default) or 'tsne' (legacy, much slower)
+            n_components (int): Output dimensionality
+            random_state (int): Seed for reproducible layouts. UMAP runs
+                single-threaded when a seed is set; pass None to use n_jobs.
+            n_neighbors (int): UMAP neighbourhood size
+            min_dist (float): UMAP minimum distance between embedded points
+            n_jobs (int): Worker threads (-1 uses every core)
+        """
         self.method = method
         self.n_components = n_components
         self.random_state = random_state
+        self.n_neighbors = n_neighbors
+        self.min_dist = min_dist
+        self.n_jobs = n_jobs
         self.reducer = None
 
     def fit_transform(self, embeddings):
@@ -27,13 +48,19 @@ class Projector:
             self.reducer = umap.UMAP(
                 n_components=self.n_components, 
                 random_state=self.random_state,
-                n_neighbors=min(15, len(embeddings) - 1) if len(embeddings) > 1 else 1
+                n_neighbors=min(self.n_neighbors, len(embeddings) - 1) if len(embeddings) > 1 else 1,
+                min_dist=self.min_dist,
+                n_jobs=self.n_jobs,
+                low_memory=True,
+                init='pca'
             )
         elif self.method == 'tsne':
             self.reducer = TSNE(
                 n_components=self.n_components, 
                 random_state=self.random_state,
-                perplexity=min(30, len(embeddings) - 1) if len(embeddings) > 1 else 1
+                perplexity=min(30, len(embeddings) - 1) if len(embeddings) > 1 else 1,
+                init='pca',
+                n_jobs=self.n_jobs
             )
         else:
             raise ValueError(f"Unknown method: {self.method}")